@@ -2,19 +2,20 @@
 Metadata Preprocessor Package for Dermatology VQA Dataset Creation
 """
 
-from .base_processor import BaseProcessor
-from .bcn20k_processor import BCN20KProcessor
-from .ddi_processor import DDIProcessor
-from .ddi2_processor import DDI2Processor
-from .derm12345_processor import Derm12345Processor
-from .ham10k_processor import HAM10KProcessor
-from .hiba_processor import HIBAProcessor
-from .isic2020_processor import ISIC2020Processor
-from .mra_midas_processor import MRAMIDASProcessor
-from .mskcc_processor import MSKCCProcessor
-from .pad_ufes20_processor import PADUfes20Processor
-from .patch16_processor import Patch16Processor
-from .scin_processor import SCINProcessor
+import importlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .processor_registry import DATASET_PROCESSORS
+
+# Processors are imported on first access (PEP 562) so using one of them
+# does not pay for loading all the others
+_LAZY_IMPORTS = {
+    'BaseProcessor': '.base_processor',
+    **{class_name: '.' + module_name for module_name, class_name in DATASET_PROCESSORS.values()}
+}
 
 __all__ = [
     'BaseProcessor',
@@ -29,5 +30,50 @@ __all__ = [
     'MSKCCProcessor',
     'PADUfes20Processor',
     'Patch16Processor',
-    'SCINProcessor'
-] 
\ No newline at end of file
+    'SCINProcessor',
+    'DATASET_PROCESSORS',
+    'run_all'
+]
+
+
+def _process_dataset(dataset_name: str, dataset_path: Path) -> List[Dict[str, Any]]:
+    """Run one dataset's processor; executed in a worker process by run_all()."""
+    _, class_name = DATASET_PROCESSORS[dataset_name]
+    processor_class = __getattr__(class_name)
+    return processor_class().process(Path(dataset_path))
+
+
+def run_all(dataset_paths: Dict[str, Path],
+            max_workers: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Process several datasets at once, each in its own worker process.
+    
+    dataset_paths maps dataset directory names (the keys of DATASET_PROCESSORS)
+    to their paths; by default one worker runs per dataset, up to the CPU count.
+    Returns the processed samples per dataset; an exception raised by any
+    processor is re-raised here.
+    """
+    unknown = set(dataset_paths) - set(DATASET_PROCESSORS)
+    if unknown:
+        raise ValueError(f"Unknown datasets: {', '.join(sorted(unknown))}")
+    
+    if max_workers is None:
+        max_workers = max(1, min(len(dataset_paths), os.cpu_count() or 1))
+    
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            dataset_name: executor.submit(_process_dataset, dataset_name, dataset_path)
+            for dataset_name, dataset_path in dataset_paths.items()
+        }
+        return {dataset_name: future.result() for dataset_name, future in futures.items()}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value  # later lookups skip __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
\ No newline at end of file
@@ -3,10 +3,93 @@ Base processor class for dermatology dataset metadata preprocessing.
 """
 
 import json
+import numpy as np
 import pandas as pd
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterator, List, Any, Optional
+
+try:
+    import python_calamine  # noqa: F401  enables pandas' Rust-backed Excel reader
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+
+# Common diagnosis mappings
+DIAGNOSIS_MAP = {
+    'mel': 'melanoma',
+    'melanoma': 'melanoma',
+    'melanoma-in-situ': 'melanoma',
+    'malignant melanoma': 'melanoma',
+    'nv': 'nevus',
+    'nevus': 'nevus',
+    'benign': 'benign',
+    'bkl': 'benign_keratosis',
+    'benign keratosis': 'benign_keratosis',
+    'bcc': 'basal_cell_carcinoma',
+    'basal cell carcinoma': 'basal_cell_carcinoma',
+    'akiec': 'actinic_keratosis',
+    'actinic keratosis': 'actinic_keratosis',
+    'df': 'dermatofibroma',
+    'dermatofibroma': 'dermatofibroma',
+    'vasc': 'vascular_lesion',
+    'vascular lesion': 'vascular_lesion',
+    'scc': 'squamous_cell_carcinoma',
+    'squamous cell carcinoma': 'squamous_cell_carcinoma',
+    'squamous-cell-carcinoma-in-situ': 'squamous_cell_carcinoma'
+}
+
+SEX_MAP = {
+    'male': 'male',
+    'female': 'female',
+    'm': 'male',
+    'f': 'female',
+    'man': 'male',
+    'woman': 'female'
+}
+
+# Common anatomical site mappings
+ANATOMICAL_SITE_MAP = {
+    'face': 'head_neck',
+    'head': 'head_neck',
+    'neck': 'head_neck',
+    'head/neck': 'head_neck',
+    'scalp': 'head_neck',
+    'ear': 'head_neck',
+    'back': 'trunk',
+    'chest': 'trunk',
+    'abdomen': 'trunk',
+    'trunk': 'trunk',
+    'anterior torso': 'trunk',
+    'posterior torso': 'trunk',
+    'arm': 'upper_extremity',
+    'hand': 'upper_extremity',
+    'palm': 'upper_extremity',
+    'back of hand': 'upper_extremity',
+    'upper extremity': 'upper_extremity',
+    'leg': 'lower_extremity',
+    'foot': 'lower_extremity',
+    'foot top or side': 'lower_extremity',
+    'foot sole': 'lower_extremity',
+    'lower extremity': 'lower_extremity',
+    'genital': 'genitalia',
+    'genitalia': 'genitalia',
+    'groin': 'genitalia',
+    'genitalia or groin': 'genitalia',
+    'buttocks': 'trunk'
+}
+
+# Text of the VQA questions asked by more than one processor
+QUESTION_TEXT = {
+    'diagnosis': 'What is the diagnosis of this skin lesion?',
+    'age': 'What is the age of the patient?',
+    'sex': 'What is the sex of the patient?',
+    'anatomical_site': 'Where is this lesion located on the body?',
+    'malignant': 'Is this lesion malignant?',
+    'benign_malignant': 'Is this lesion benign or malignant?',
+    'fitzpatrick': 'What is the Fitzpatrick skin type?'
+}
 
 
 class BaseProcessor(ABC):
@@ -30,6 +113,14 @@ class BaseProcessor(ABC):
         """Process the dataset and return standardized metadata."""
         pass
     
+    def iter_samples(self, dataset_path: Path) -> Iterator[Dict[str, Any]]:
+        """Yield standardized samples one at a time.
+        
+        Processors that can stream their metadata override this; by default
+        it walks the list returned by process().
+        """
+        yield from self.process(dataset_path)
+    
     def create_standardized_sample(self, 
                                    sample_id: str,
                                    image_path: str,
@@ -60,31 +151,7 @@ class BaseProcessor(ABC):
         
         diagnosis = str(diagnosis).lower().strip()
         
-        # Common diagnosis mappings
-        diagnosis_map = {
-            'mel': 'melanoma',
-            'melanoma': 'melanoma',
-            'melanoma-in-situ': 'melanoma',
-            'malignant melanoma': 'melanoma',
-            'nv': 'nevus',
-            'nevus': 'nevus',
-            'benign': 'benign',
-            'bkl': 'benign_keratosis',
-            'benign keratosis': 'benign_keratosis',
-            'bcc': 'basal_cell_carcinoma',
-            'basal cell carcinoma': 'basal_cell_carcinoma',
-            'akiec': 'actinic_keratosis',
-            'actinic keratosis': 'actinic_keratosis',
-            'df': 'dermatofibroma',
-            'dermatofibroma': 'dermatofibroma',
-            'vasc': 'vascular_lesion',
-            'vascular lesion': 'vascular_lesion',
-            'scc': 'squamous_cell_carcinoma',
-            'squamous cell carcinoma': 'squamous_cell_carcinoma',
-            'squamous-cell-carcinoma-in-situ': 'squamous_cell_carcinoma'
-        }
-        
-        return diagnosis_map.get(diagnosis, diagnosis)
+        return DIAGNOSIS_MAP.get(diagnosis, diagnosis)
     
     def standardize_age(self, age: Any) -> Optional[float]:
         """Standardize age values."""
@@ -104,16 +171,7 @@ class BaseProcessor(ABC):
         
         sex = str(sex).lower().strip()
         
-        sex_map = {
-            'male': 'male',
-            'female': 'female',
-            'm': 'male',
-            'f': 'female',
-            'man': 'male',
-            'woman': 'female'
-        }
-        
-        return sex_map.get(sex, 'unknown')
+        return SEX_MAP.get(sex, 'unknown')
     
     def standardize_anatomical_site(self, site: Any) -> Optional[str]:
         """Standardize anatomical site values."""
@@ -122,38 +180,47 @@ class BaseProcessor(ABC):
         
         site = str(site).lower().strip()
         
-        # Common anatomical site mappings
-        site_map = {
-            'face': 'head_neck',
-            'head': 'head_neck',
-            'neck': 'head_neck',
-            'head/neck': 'head_neck',
-            'scalp': 'head_neck',
-            'ear': 'head_neck',
-            'back': 'trunk',
-            'chest': 'trunk',
-            'abdomen': 'trunk',
-            'trunk': 'trunk',
-            'anterior torso': 'trunk',
-            'posterior torso': 'trunk',
-            'arm': 'upper_extremity',
-            'hand': 'upper_extremity',
-            'palm': 'upper_extremity',
-            'back of hand': 'upper_extremity',
-            'upper extremity': 'upper_extremity',
-            'leg': 'lower_extremity',
-            'foot': 'lower_extremity',
-            'foot top or side': 'lower_extremity',
-            'foot sole': 'lower_extremity',
-            'lower extremity': 'lower_extremity',
-            'genital': 'genitalia',
-            'genitalia': 'genitalia',
-            'groin': 'genitalia',
-            'genitalia or groin': 'genitalia',
-            'buttocks': 'trunk'
-        }
-        
-        return site_map.get(site, site)
+        return ANATOMICAL_SITE_MAP.get(site, site)
+    
+    def standardize_diagnosis_series(self, series: pd.Series) -> pd.Series:
+        """Standardize a whole column of diagnosis labels."""
+        return self._standardize_series(series, self.standardize_diagnosis)
+    
+    def standardize_age_series(self, series: pd.Series) -> pd.Series:
+        """Standardize a whole column of age values."""
+        return self._standardize_series(series, self.standardize_age)
+    
+    def standardize_sex_series(self, series: pd.Series) -> pd.Series:
+        """Standardize a whole column of sex values."""
+        return self._standardize_series(series, self.standardize_sex)
+    
+    def standardize_anatomical_site_series(self, series: pd.Series) -> pd.Series:
+        """Standardize a whole column of anatomical site values."""
+        return self._standardize_series(series, self.standardize_anatomical_site)
+    
+    def _standardize_series(self, series: pd.Series, standardize: Callable[[Any], Any]) -> pd.Series:
+        """Apply a scalar standardizer once per distinct value of a column."""
+        codes, uniques = pd.factorize(series)
+        # Code -1 marks missing values, which pick the trailing entry
+        lookup = np.array([standardize(value) for value in uniques] + [standardize(None)], dtype=object)
+        return pd.Series(lookup[codes], index=series.index, dtype=object)
+    
+    def _column(self, df: pd.DataFrame, *names: str, default: Any = None) -> pd.Series:
+        """Return the first of the named columns present in df, or a column of default."""
+        for name in names:
+            if name in df.columns:
+                return df[name]
+        return pd.Series(default, index=df.index, dtype=object)
+    
+    def shared_values(self, series: pd.Series) -> List[Any]:
+        """Return a column as a list in which equal values share one Python object."""
+        codes, uniques = pd.factorize(series)
+        values = np.array(uniques.tolist() + [None], dtype=object)[codes]
+        missing = codes < 0
+        if missing.any():
+            # Keep each missing value exactly as the column holds it
+            values[missing] = series.to_numpy(dtype=object)[missing]
+        return values.tolist()
     
     def read_csv_safely(self, file_path: Path, **kwargs) -> pd.DataFrame:
         """Safely read CSV files with error handling."""
@@ -163,44 +230,69 @@ class BaseProcessor(ABC):
             print(f"Error reading {file_path}: {str(e)}")
             return pd.DataFrame()
     
+    def read_excel(self, file_path: Path, **kwargs) -> pd.DataFrame:
+        """Read an Excel sheet, using the calamine engine when it is installed."""
+        if HAS_CALAMINE:
+            kwargs.setdefault('engine', 'calamine')
+        return pd.read_excel(file_path, **kwargs)
+    
     def generate_vqa_questions(self, sample: Dict[str, Any]) -> List[Dict[str, str]]:
         """Generate VQA questions for a sample."""
-        questions = []
+        diagnosis = sample.get('diagnosis', 'unknown')
         
         # Basic questions
-        questions.append({
-            'question': 'What is the diagnosis of this skin lesion?',
-            'answer': sample.get('diagnosis', 'unknown')
-        })
+        questions = [{
+            'question': QUESTION_TEXT['diagnosis'],
+            'answer': diagnosis
+        }]
         
         if sample.get('age'):
             questions.append({
-                'question': 'What is the age of the patient?',
+                'question': QUESTION_TEXT['age'],
                 'answer': f"{sample['age']} years old"
             })
         
         if sample.get('sex'):
             questions.append({
-                'question': 'What is the sex of the patient?',
+                'question': QUESTION_TEXT['sex'],
                 'answer': sample['sex']
             })
         
         if sample.get('anatomical_site'):
             questions.append({
-                'question': 'Where is this lesion located on the body?',
+                'question': QUESTION_TEXT['anatomical_site'],
                 'answer': sample['anatomical_site']
             })
         
         # Additional diagnostic questions
-        if sample.get('diagnosis') == 'melanoma':
+        if diagnosis == 'melanoma':
             questions.append({
-                'question': 'Is this lesion malignant?',
+                'question': QUESTION_TEXT['malignant'],
                 'answer': 'Yes, this is a malignant melanoma'
             })
-        elif sample.get('diagnosis') in ['nevus', 'benign']:
+        elif diagnosis in ('nevus', 'benign'):
             questions.append({
-                'question': 'Is this lesion malignant?',
+                'question': QUESTION_TEXT['malignant'],
                 'answer': 'No, this is a benign lesion'
             })
         
-        return questions 
\ No newline at end of file
+        return questions
+    
+    def generate_vqa_questions_batch(self, diagnoses: List[Any], ages: List[Any],
+                                     sexes: List[Any], sites: List[Any]) -> List[List[Dict[str, str]]]:
+        """Generate the basic VQA questions for many samples from their standardized columns.
+        
+        Gives the same questions as generate_vqa_questions row by row, without
+        building a sample dict first. Samples share few (diagnosis, age, sex, site)
+        combinations, so the questions are worked out once per combination.
+        """
+        pairs_by_key = {}
+        batch = []
+        for key in zip(diagnoses, ages, sexes, sites):
+            pairs = pairs_by_key.get(key)
+            if pairs is None:
+                sample = dict(zip(('diagnosis', 'age', 'sex', 'anatomical_site'), key))
+                pairs = pairs_by_key[key] = [(qa['question'], qa['answer']) for qa in self.generate_vqa_questions(sample)]
+            # Fresh dicts for every sample, since processors append to and may edit them
+            batch.append([{'question': question, 'answer': answer} for question, answer in pairs])
+        return batch
\ No newline at end of file
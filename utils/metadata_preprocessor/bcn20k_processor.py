@@ -2,10 +2,49 @@
 BCN20K Dataset Processor
 """
 
+import os
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Any
-from base_processor import BaseProcessor
+from typing import Dict, Iterator, List, Any
+try:
+    from .base_processor import BaseProcessor, QUESTION_TEXT
+except ImportError:  # run as a script from this directory
+    from base_processor import BaseProcessor, QUESTION_TEXT
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq  # enables the multithreaded CSV reader and Parquet cache
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+# Columns copied verbatim into each sample's metadata, in output order
+METADATA_COLUMNS = (
+    'isic_id',
+    'attribution',
+    'copyright_license',
+    'anatom_site_special',
+    'benign_malignant',
+    'concomitant_biopsy',
+    'diagnosis_1',
+    'diagnosis_2',
+    'diagnosis_3',
+    'diagnosis_confirm_type',
+    'image_type',
+    'lesion_id',
+    'melanocytic'
+)
+
+# Metadata columns with only a handful of distinct values across all rows
+SHARED_VALUE_COLUMNS = tuple(column for column in METADATA_COLUMNS if column not in ('isic_id', 'lesion_id'))
+
+# Every column read from the metadata file
+USECOLS = METADATA_COLUMNS + ('age_approx', 'anatom_site_general', 'sex')
+
+# Rows converted to samples at a time
+CHUNK_SIZE = 50_000
 
 
 class BCN20KProcessor(BaseProcessor):
@@ -17,75 +56,155 @@ class BCN20KProcessor(BaseProcessor):
     def process(self, dataset_path: Path) -> List[Dict[str, Any]]:
         """Process BCN20K dataset metadata."""
         
-        # Look for the metadata file
+        # Read every chunk before converting any, so a read error yields no samples at all
+        metadata_file = self._metadata_file(dataset_path)
+        try:
+            chunks = list(self.read_metadata_chunks(metadata_file))
+        except Exception as e:
+            print(f"Error reading BCN20K metadata: {e}")
+            return []
+        
+        return [sample for chunk in chunks for sample in self._process_chunk(chunk)]
+    
+    def iter_samples(self, dataset_path: Path) -> Iterator[Dict[str, Any]]:
+        """Stream BCN20K samples chunk by chunk to bound peak memory."""
+        metadata_file = self._metadata_file(dataset_path)
+        
+        # Chunks are read lazily. As in process(), a read error before any sample prints and
+        # yields nothing; a later one propagates, so a writer discards its partial output
+        # rather than finishing a truncated file
+        try:
+            chunks = iter(self.read_metadata_chunks(metadata_file))
+            chunk = next(chunks, None)
+        except Exception as e:
+            print(f"Error reading BCN20K metadata: {e}")
+            return
+        
+        while chunk is not None:
+            yield from self._process_chunk(chunk)
+            chunk = next(chunks, None)
+    
+    @staticmethod
+    def _metadata_file(dataset_path: Path) -> Path:
+        """Locate the metadata file."""
         metadata_file = dataset_path / 'bcn20000_metadata_2025-05-22.csv'
         if not metadata_file.exists():
             raise FileNotFoundError(f"Metadata file not found: {metadata_file}")
+        return metadata_file
+    
+    def read_metadata_chunks(self, metadata_file: Path) -> Iterator[pd.DataFrame]:
+        """Read the columns we use in chunks, reusing a Parquet copy of the CSV when pyarrow is available."""
+        if not HAS_PYARROW:
+            return pd.read_csv(metadata_file, low_memory=False, chunksize=CHUNK_SIZE,
+                               usecols=lambda column: column in USECOLS)
+        
+        # The Parquet copy sits next to the CSV and is rebuilt whenever the CSV is newer. It is read
+        # whole, a fraction of the size of the samples made from it, so a damaged copy is found
+        # before any rows are used and the CSV is read instead
+        cache_file = metadata_file.with_suffix('.parquet')
+        df = None
+        if cache_file.exists() and cache_file.stat().st_mtime >= metadata_file.stat().st_mtime:
+            try:
+                names = pq.read_schema(cache_file).names
+                df = pq.read_table(cache_file, columns=[column for column in USECOLS if column in names]).to_pandas()
+            except (OSError, pa.ArrowException) as e:
+                print(f"Discarding unreadable BCN20K Parquet cache: {e}")
+                cache_file.unlink(missing_ok=True)
+        
+        if df is None:
+            # pyarrow's CSV engine cannot read in chunks, so slice the parsed frame instead
+            df = pd.read_csv(metadata_file, engine='pyarrow')
+            self._write_cache(df, cache_file)
         
-        # Read the metadata file with error handling for large files
+        df = self._normalize_missing(df[[column for column in USECOLS if column in df]])
+        return (df.iloc[start:start + CHUNK_SIZE] for start in range(0, len(df), CHUNK_SIZE))
+    
+    @staticmethod
+    def _write_cache(df: pd.DataFrame, cache_file: Path) -> None:
+        """Save df as the Parquet cache, through a temporary file so an interrupted write leaves no partial cache."""
+        tmp_file = cache_file.with_suffix('.tmp.parquet')
         try:
-            df = pd.read_csv(metadata_file, low_memory=False)
-        except Exception as e:
-            print(f"Error reading BCN20K metadata: {e}")
-            return []
+            df.to_parquet(tmp_file, index=False)
+            os.replace(tmp_file, cache_file)
+        except (OSError, pa.ArrowException) as e:
+            tmp_file.unlink(missing_ok=True)
+            print(f"Could not cache BCN20K metadata as Parquet: {e}")
+    
+    def _process_chunk(self, df: pd.DataFrame) -> Iterator[Dict[str, Any]]:
+        """Convert one chunk of metadata rows into standardized samples."""
         
-        processed_samples = []
+        # Pull every column out once instead of boxing a Series per row
+        columns = {name: self._column(df, name) for name in USECOLS}
+        isic_ids = columns['isic_id'].tolist()
+        image_paths = [f"images/{isic_id}.jpg" for isic_id in isic_ids]
+        # Repeated strings in low-cardinality columns point at one shared object each
+        metadata_rows = zip(*(
+            self.shared_values(columns[name]) if name in SHARED_VALUE_COLUMNS else columns[name].tolist()
+            for name in METADATA_COLUMNS
+        ))
         
-        for _, row in df.iterrows():
-            # Create image path
-            image_path = f"images/{row['isic_id']}.jpg"
-            
-            # Extract additional metadata
-            additional_metadata = {
-                'isic_id': row['isic_id'],
-                'attribution': row.get('attribution'),
-                'copyright_license': row.get('copyright_license'),
-                'anatom_site_special': row.get('anatom_site_special'),
-                'benign_malignant': row.get('benign_malignant'),
-                'concomitant_biopsy': row.get('concomitant_biopsy'),
-                'diagnosis_1': row.get('diagnosis_1'),
-                'diagnosis_2': row.get('diagnosis_2'),
-                'diagnosis_3': row.get('diagnosis_3'),
-                'diagnosis_confirm_type': row.get('diagnosis_confirm_type'),
-                'image_type': row.get('image_type'),
-                'lesion_id': row.get('lesion_id'),
-                'melanocytic': row.get('melanocytic')
+        # Standardize each distinct value once rather than once per row
+        diagnoses = self.standardize_diagnosis_series(columns['diagnosis_1']).tolist()
+        ages = self.standardize_age_series(columns['age_approx']).tolist()
+        sexes = self.standardize_sex_series(columns['sex']).tolist()
+        sites = self.standardize_anatomical_site_series(columns['anatom_site_general']).tolist()
+        question_lists = self.generate_vqa_questions_batch(diagnoses, ages, sexes, sites)
+        
+        # Masks and answers for the BCN20K-specific questions
+        benign_malignant = columns['benign_malignant'].tolist()
+        has_benign_malignant = columns['benign_malignant'].notna().tolist()
+        melanocytic = columns['melanocytic'].tolist()
+        has_melanocytic = columns['melanocytic'].notna().tolist()
+        confirm_types = columns['diagnosis_confirm_type'].tolist()
+        has_confirm_type = columns['diagnosis_confirm_type'].notna().tolist()
+        
+        for i, metadata_values in enumerate(metadata_rows):
+            sample = {
+                'dataset_name': self.dataset_name,
+                'sample_id': isic_ids[i],
+                'image_path': image_paths[i],
+                'diagnosis': diagnoses[i],
+                'age': ages[i],
+                'sex': sexes[i],
+                'anatomical_site': sites[i],
+                'metadata': dict(zip(METADATA_COLUMNS, metadata_values))
             }
             
-            # Create standardized sample
-            sample = self.create_standardized_sample(
-                sample_id=row['isic_id'],
-                image_path=image_path,
-                diagnosis=row.get('diagnosis_1', 'unknown'),
-                age=row.get('age_approx'),
-                sex=row.get('sex'),
-                anatomical_site=row.get('anatom_site_general'),
-                additional_metadata=additional_metadata
-            )
-            
             # Add VQA questions
-            sample['vqa_questions'] = self.generate_vqa_questions(sample)
+            questions = question_lists[i]
             
             # Add BCN20K-specific questions
-            if pd.notna(row.get('benign_malignant')):
-                sample['vqa_questions'].append({
-                    'question': 'Is this lesion benign or malignant?',
-                    'answer': row['benign_malignant']
+            if has_benign_malignant[i]:
+                questions.append({
+                    'question': QUESTION_TEXT['benign_malignant'],
+                    'answer': benign_malignant[i]
                 })
             
-            if pd.notna(row.get('melanocytic')):
-                melanocytic_answer = 'Yes' if row['melanocytic'] else 'No'
-                sample['vqa_questions'].append({
+            if has_melanocytic[i]:
+                questions.append({
                     'question': 'Is this lesion melanocytic?',
-                    'answer': melanocytic_answer
+                    'answer': 'Yes' if melanocytic[i] else 'No'
                 })
             
-            if pd.notna(row.get('diagnosis_confirm_type')):
-                sample['vqa_questions'].append({
+            if has_confirm_type[i]:
+                questions.append({
                     'question': 'How was this diagnosis confirmed?',
-                    'answer': row['diagnosis_confirm_type']
+                    'answer': confirm_types[i]
                 })
             
-            processed_samples.append(sample)
-        
-        return processed_samples 
\ No newline at end of file
+            sample['vqa_questions'] = questions
+            yield sample
+    
+    @staticmethod
+    def _normalize_missing(df: pd.DataFrame) -> pd.DataFrame:
+        """Mark gaps in object columns with NaN, as the C parser does, rather than pyarrow's None."""
+        object_columns = df.select_dtypes(include=object).columns
+        df[object_columns] = df[object_columns].where(df[object_columns].notna(), np.nan)
+        return df
+    
+    @staticmethod
+    def _column(df: pd.DataFrame, name: str) -> pd.Series:
+        """Return a column, or an all-missing column if the file lacks it."""
+        if name in df:
+            return df[name]
+        return pd.Series(None, index=df.index, dtype=object) 
\ No newline at end of file
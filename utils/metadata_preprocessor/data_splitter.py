@@ -5,11 +5,137 @@ Creates train/validation/test splits with stratification support.
 """
 
 import json
+import mmap
 import random
 import numpy as np
+import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Union
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson  # optional, several times faster than the json module
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def load_json(path: Path) -> Any:
+    """Load a JSON file, with orjson when it is installed.
+    
+    A .jsonl file is read as JSON Lines and loads as the list of its records.
+    """
+    if path.suffix == '.jsonl':
+        with open(path, 'rb') as f:
+            return [_loads_line(line) for line in f if line.strip()]
+    if HAS_ORJSON and path.stat().st_size:
+        # Parse straight from the page cache instead of first copying the file into a bytes object
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # orjson rejects the NaN literals json.dump writes for missing values, so files
+            # holding any go straight to json instead of being parsed twice
+            if mm.find(b'NaN') == -1:
+                with memoryview(mm) as view:
+                    try:
+                        return orjson.loads(view)
+                    except orjson.JSONDecodeError:
+                        pass
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _loads_line(line: bytes) -> Any:
+    """Parse one JSON Lines record, with json.loads when it holds the NaN literals orjson rejects."""
+    if HAS_ORJSON and b'NaN' not in line:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(line)
+
+
+def dump_json(obj: Any, path: Path) -> None:
+    """Write obj to path as indented JSON, with orjson when it is installed."""
+    if HAS_ORJSON:
+        # orjson writes NaN as null and accepts the non-string keys json.dump allows
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(path, 'w') as f:
+            json.dump(obj, f, indent=2)
+
+
+# Samples either as a list of dicts or as a frame with one column per field
+Samples = Union[List[Dict[str, Any]], pd.DataFrame]
+
+# Standardized fields with only a handful of distinct values, stored dictionary-encoded
+CATEGORICAL_FIELDS = ('dataset_name', 'diagnosis', 'sex', 'anatomical_site')
+
+# Column of a frame from records_to_frame holding the tuple of keys each sample has
+SAMPLE_KEYS_COLUMN = '__sample_keys__'
+
+
+def records_to_frame(data: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Lay samples out column by column, keeping every value as the original Python object.
+    
+    The keys of each sample are kept in SAMPLE_KEYS_COLUMN, so frame_to_records gives
+    back exactly the keys a sample had and fields can tell a missing key from None.
+    """
+    fields = dict.fromkeys(key for sample in data for key in sample)
+    # Samples with the same keys share one tuple
+    key_tuples = {}
+    sample_keys = [key_tuples.setdefault(keys, keys) for keys in (tuple(sample) for sample in data)]
+    frame = pd.DataFrame({
+        field: pd.Series([sample.get(field) for sample in data],
+                         dtype='category' if field in CATEGORICAL_FIELDS else object)
+        for field in fields
+    })
+    frame[SAMPLE_KEYS_COLUMN] = pd.Series(sample_keys, dtype=object)
+    return frame
+
+
+def frame_to_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Turn a frame from records_to_frame back into a list of sample dicts, each with its own keys."""
+    categorical = [field for field in CATEGORICAL_FIELDS if field in frame]
+    if categorical:
+        frame = frame.assign(**{field: _category_values(frame[field]) for field in categorical})
+    if SAMPLE_KEYS_COLUMN not in frame:
+        return frame.to_dict('records')
+    
+    sample_keys = frame[SAMPLE_KEYS_COLUMN].tolist()
+    records = frame.drop(columns=SAMPLE_KEYS_COLUMN).to_dict('records')
+    # Samples that have every field in the frame's column order come back as they are
+    all_fields = tuple(field for field in frame.columns if field != SAMPLE_KEYS_COLUMN)
+    return [
+        record if keys == all_fields else {key: record[key] for key in keys}
+        for record, keys in zip(records, sample_keys)
+    ]
+
+
+def _has_field(frame: pd.DataFrame, field: str) -> np.ndarray:
+    """Whether each sample of a frame from records_to_frame has the field, as a boolean array."""
+    if SAMPLE_KEYS_COLUMN not in frame:
+        return np.ones(len(frame), dtype=bool)
+    sample_keys = frame[SAMPLE_KEYS_COLUMN].tolist()
+    has_field = {keys: field in keys for keys in set(sample_keys)}
+    return np.fromiter((has_field[keys] for keys in sample_keys), dtype=bool, count=len(sample_keys))
+
+
+def _category_values(column: pd.Series) -> pd.Series:
+    """Decode a categorical column back to Python objects, with None for missing values."""
+    return column.astype(object).where(column.notna(), None)
+
+
+def _category_counts(column: pd.Series) -> Dict[Any, int]:
+    """Count a categorical column as Counter would, keyed in order of first appearance."""
+    codes, first_seen, counts = np.unique(column.cat.codes.to_numpy(),
+                                          return_index=True, return_counts=True)
+    categories = column.cat.categories.tolist()
+    order = np.argsort(first_seen)
+    return {
+        categories[code] if code >= 0 else None: count
+        for code, count in zip(codes[order].tolist(), counts[order].tolist())
+    }
 
 
 class DataSplitter:
@@ -19,68 +145,63 @@ class DataSplitter:
         self.random_seed = random_seed
         random.seed(random_seed)
         np.random.seed(random_seed)
+        self.rng = np.random.default_rng(random_seed)
     
-    def stratified_split(self, data: List[Dict[str, Any]], 
+    def stratified_split(self, data: Samples, 
                         train_ratio: float = 0.7, 
                         val_ratio: float = 0.15, 
                         test_ratio: float = 0.15,
                         stratify_by: str = 'diagnosis') -> Tuple[List, List, List]:
-        """Split data with stratification to maintain class balance."""
+        """Split data with stratification to maintain class balance.
+        
+        data may be a list of sample dicts or a frame from records_to_frame;
+        the splits come back in the same form.
+        """
         
         # Validate ratios
         if abs(train_ratio + val_ratio + test_ratio - 1.0) > 1e-6:
             raise ValueError("Ratios must sum to 1.0")
         
-        # Group samples by stratification key
-        groups = {}
-        for sample in data:
-            key = sample.get(stratify_by, 'unknown')
-            if key not in groups:
-                groups[key] = []
-            groups[key].append(sample)
+        # Give each stratification key an integer code in order of first appearance
+        codes, n_groups = self._group_codes(data, stratify_by, 'unknown')
+        counts = np.bincount(codes, minlength=n_groups)
+        n_train, n_val = self._compute_split_sizes(counts, train_ratio, val_ratio)
         
-        train_data, val_data, test_data = [], [], []
+        # Shuffle samples within each group: sort by group, breaking ties randomly
+        order = np.lexsort((self.rng.random(len(data)), codes))
+        grouped_codes = codes[order]
+        group_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        position = np.arange(len(data)) - group_starts[grouped_codes]
         
-        for key, samples in groups.items():
-            # Shuffle samples within each group
-            random.shuffle(samples)
-            
-            n_samples = len(samples)
-            n_train = int(n_samples * train_ratio)
-            n_val = int(n_samples * val_ratio)
-            
-            # Ensure at least one sample per split if possible
-            if n_samples >= 3:
-                if n_train == 0:
-                    n_train = 1
-                if n_val == 0:
-                    n_val = 1
-                
-                # Adjust if needed
-                n_test = n_samples - n_train - n_val
-                if n_test < 0:
-                    n_test = 0
-                    n_val = n_samples - n_train
-            elif n_samples == 2:
-                n_train, n_val, n_test = 1, 1, 0
-            elif n_samples == 1:
-                n_train, n_val, n_test = 1, 0, 0
-            else:
-                continue
-            
-            # Split the samples
-            train_data.extend(samples[:n_train])
-            val_data.extend(samples[n_train:n_train + n_val])
-            test_data.extend(samples[n_train + n_val:])
+        # The first n_train of each group go to train, the next n_val to val, the rest to test
+        in_train = position < n_train[grouped_codes]
+        in_val = ~in_train & (position < (n_train + n_val)[grouped_codes])
+        in_test = ~(in_train | in_val)
         
-        # Final shuffle
-        random.shuffle(train_data)
-        random.shuffle(val_data)
-        random.shuffle(test_data)
+        # Final shuffle, done on the indices so the samples are only touched once
+        train_data = self._take(data, self.rng.permutation(order[in_train]))
+        val_data = self._take(data, self.rng.permutation(order[in_val]))
+        test_data = self._take(data, self.rng.permutation(order[in_test]))
         
         return train_data, val_data, test_data
     
-    def random_split(self, data: List[Dict[str, Any]], 
+    @staticmethod
+    def _compute_split_sizes(counts: np.ndarray, train_ratio: float,
+                             val_ratio: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Return per-group train and val sizes; the rest of each group goes to test."""
+        n_train = (counts * train_ratio).astype(np.int64)
+        n_val = (counts * val_ratio).astype(np.int64)
+        
+        # Ensure at least one sample per split if possible
+        large = counts >= 3
+        n_train = np.where(large, np.maximum(n_train, 1), np.minimum(counts, 1))
+        n_val = np.where(large, np.maximum(n_val, 1), (counts == 2).astype(np.int64))
+        
+        # Adjust if needed
+        n_val = np.minimum(n_val, counts - n_train)
+        return n_train, n_val
+    
+    def random_split(self, data: Samples, 
                     train_ratio: float = 0.7, 
                     val_ratio: float = 0.15, 
                     test_ratio: float = 0.15) -> Tuple[List, List, List]:
@@ -90,62 +211,98 @@ class DataSplitter:
         if abs(train_ratio + val_ratio + test_ratio - 1.0) > 1e-6:
             raise ValueError("Ratios must sum to 1.0")
         
-        # Shuffle data
-        data_copy = data.copy()
-        random.shuffle(data_copy)
-        
-        n_samples = len(data_copy)
+        # Shuffle indices rather than the samples themselves
+        n_samples = len(data)
+        perm = self.rng.permutation(n_samples)
         n_train = int(n_samples * train_ratio)
         n_val = int(n_samples * val_ratio)
         
-        train_data = data_copy[:n_train]
-        val_data = data_copy[n_train:n_train + n_val]
-        test_data = data_copy[n_train + n_val:]
+        train_data = self._take(data, perm[:n_train])
+        val_data = self._take(data, perm[n_train:n_train + n_val])
+        test_data = self._take(data, perm[n_train + n_val:])
         
         return train_data, val_data, test_data
     
-    def dataset_aware_split(self, data: List[Dict[str, Any]], 
+    def dataset_aware_split(self, data: Samples, 
                            train_ratio: float = 0.7, 
                            val_ratio: float = 0.15, 
                            test_ratio: float = 0.15) -> Tuple[List, List, List]:
         """Split data ensuring samples from same dataset are not split across train/val/test."""
         
-        # Group by dataset
-        dataset_groups = {}
-        for sample in data:
-            dataset_name = sample.get('dataset_name', 'unknown')
-            if dataset_name not in dataset_groups:
-                dataset_groups[dataset_name] = []
-            dataset_groups[dataset_name].append(sample)
+        # Number the datasets in order of first appearance
+        codes, n_datasets = self._group_codes(data, 'dataset_name', 'unknown')
         
-        # Determine dataset assignment to splits
-        datasets = list(dataset_groups.keys())
-        random.shuffle(datasets)
+        # Determine dataset assignment to splits, shuffled by the seeded generator the other splits use
+        datasets = self.rng.permutation(n_datasets)
         
-        n_datasets = len(datasets)
         n_train_datasets = max(1, int(n_datasets * train_ratio))
         n_val_datasets = max(1, int(n_datasets * val_ratio)) if n_datasets > 1 else 0
         
-        train_datasets = datasets[:n_train_datasets]
-        val_datasets = datasets[n_train_datasets:n_train_datasets + n_val_datasets]
-        test_datasets = datasets[n_train_datasets + n_val_datasets:]
-        
-        # Collect samples
-        train_data = []
-        val_data = []
-        test_data = []
-        
-        for dataset in train_datasets:
-            train_data.extend(dataset_groups[dataset])
+        # Order samples dataset by dataset as shuffled, keeping file order within each
+        rank = np.empty(n_datasets, dtype=np.int64)
+        rank[datasets] = np.arange(n_datasets)
+        order = np.argsort(rank[codes], kind='stable')
         
-        for dataset in val_datasets:
-            val_data.extend(dataset_groups[dataset])
+        # Sample offsets where each dataset starts in that order
+        sizes = np.bincount(codes, minlength=n_datasets)[datasets]
+        offsets = np.concatenate(([0], np.cumsum(sizes)))
+        train_end = offsets[min(n_train_datasets, n_datasets)]
+        val_end = offsets[min(n_train_datasets + n_val_datasets, n_datasets)]
         
-        for dataset in test_datasets:
-            test_data.extend(dataset_groups[dataset])
+        train_data = self._take(data, order[:train_end])
+        val_data = self._take(data, order[train_end:val_end])
+        test_data = self._take(data, order[val_end:])
         
         return train_data, val_data, test_data
     
+    @staticmethod
+    def _group_codes(data: Samples, field: str, default: Any) -> Tuple[np.ndarray, int]:
+        """Number each distinct value of a field in order of first appearance; return the codes and how many there are."""
+        if isinstance(data, pd.DataFrame) and field in data:
+            codes, uniques = pd.factorize(DataSplitter._frame_column(data, field, default), use_na_sentinel=False)
+            return codes.astype(np.int64), len(uniques)
+        
+        key_codes = {}
+        codes = np.fromiter(
+            (key_codes.setdefault(key, len(key_codes)) for key in DataSplitter._field(data, field, default)),
+            dtype=np.int64, count=len(data))
+        return codes, len(key_codes)
+    
+    @staticmethod
+    def _field(data: Samples, field: str, default: Any) -> List[Any]:
+        """Return one field of every sample as a list, with default for samples without it."""
+        if isinstance(data, pd.DataFrame):
+            column = DataSplitter._frame_column(data, field, default)
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                return _category_values(column).tolist()
+            return column.tolist()
+        return [sample.get(field, default) for sample in data]
+    
+    @staticmethod
+    def _frame_column(data: pd.DataFrame, field: str, default: Any) -> pd.Series:
+        """Return one column of a frame, with default for the samples that lack the field as sample.get would."""
+        if field not in data:
+            return pd.Series([default] * len(data), index=data.index, dtype=object)
+        column = data[field]
+        if default is None:
+            return column
+        has_field = _has_field(data, field)
+        if has_field.all():
+            return column
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            if default not in column.cat.categories:
+                column = column.cat.add_categories([default])
+            return column.where(has_field, default)
+        return pd.Series([value if has else default for value, has in zip(column.tolist(), has_field.tolist())],
+                         index=column.index, dtype=object)
+    
+    @staticmethod
+    def _take(data: Samples, indices: np.ndarray) -> Samples:
+        """Gather the samples at the given positions."""
+        if isinstance(data, pd.DataFrame):
+            return data.take(indices).reset_index(drop=True)
+        return [data[i] for i in indices.tolist()]
+    
     def split_dataset(self, input_file: Path, 
                      output_dir: Path,
                      train_ratio: float = 0.7,
@@ -159,8 +316,7 @@ class DataSplitter:
             return {'error': f'Input file not found: {input_file}'}
         
         try:
-            with open(input_file, 'r') as f:
-                data = json.load(f)
+            data = records_to_frame(load_json(input_file))
         except json.JSONDecodeError as e:
             return {'error': f'Invalid JSON: {e}'}
         
@@ -195,66 +351,117 @@ class DataSplitter:
             'splits': {}
         }
         
-        for split_name, split_data in splits.items():
-            if split_data:  # Only save non-empty splits
-                output_file = output_dir / f"{base_name}_{split_name}.json"
-                with open(output_file, 'w') as f:
-                    json.dump(split_data, f, indent=2)
-                
-                # Collect split statistics
-                split_stats = self._get_split_statistics(split_data)
-                split_info['splits'][split_name] = {
-                    'file': str(output_file),
-                    'samples': len(split_data),
-                    'percentage': len(split_data) / len(data) * 100,
-                    'statistics': split_stats
-                }
+        # Write the split files concurrently; statistics are gathered meanwhile
+        with ThreadPoolExecutor(max_workers=len(splits)) as executor:
+            writes = []
+            for split_name, split_data in splits.items():
+                if len(split_data):  # Only save non-empty splits
+                    output_file = output_dir / f"{base_name}_{split_name}.json"
+                    writes.append(executor.submit(dump_json, frame_to_records(split_data), output_file))
+                    
+                    # Collect split statistics
+                    split_stats = self._get_split_statistics(split_data)
+                    split_info['splits'][split_name] = {
+                        'file': str(output_file),
+                        'samples': len(split_data),
+                        'percentage': len(split_data) / len(data) * 100,
+                        'statistics': split_stats
+                    }
+            
+            # Surface any write error before the split info is saved
+            for write in writes:
+                write.result()
         
         # Save split information
         info_file = output_dir / f"{base_name}_split_info.json"
-        with open(info_file, 'w') as f:
-            json.dump(split_info, f, indent=2)
+        dump_json(split_info, info_file)
         
         return split_info
     
-    def _get_split_statistics(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _get_split_statistics(self, data: Samples) -> Dict[str, Any]:
         """Get statistics for a data split."""
-        stats = {}
-        
-        # Dataset distribution
-        datasets = [sample.get('dataset_name', 'unknown') for sample in data]
-        stats['dataset_distribution'] = dict(Counter(datasets))
+        if isinstance(data, pd.DataFrame):
+            return self._get_frame_statistics(data)
+        
+        dataset_counts, diagnosis_counts = Counter(), Counter()
+        sex_counts, site_counts = Counter(), Counter()
+        total_questions = 0
+        
+        # Gather every distribution in a single pass over the samples
+        fields = zip(self._field(data, 'dataset_name', 'unknown'),
+                     self._field(data, 'diagnosis', 'unknown'),
+                     self._field(data, 'sex', None),
+                     self._field(data, 'anatomical_site', None),
+                     self._field(data, 'vqa_questions', []))
+        for dataset_name, diagnosis, sex, site, questions in fields:
+            dataset_counts[dataset_name] += 1
+            diagnosis_counts[diagnosis] += 1
+            if sex:
+                sex_counts[sex] += 1
+            if site:
+                site_counts[site] += 1
+            total_questions += len(questions)
+        
+        stats = {
+            'dataset_distribution': dict(dataset_counts),
+            'diagnosis_distribution': dict(diagnosis_counts)
+        }
+        if sex_counts:
+            stats['sex_distribution'] = dict(sex_counts)
+        if site_counts:
+            stats['anatomical_site_distribution'] = dict(site_counts)
         
-        # Diagnosis distribution
-        diagnoses = [sample.get('diagnosis', 'unknown') for sample in data]
-        stats['diagnosis_distribution'] = dict(Counter(diagnoses))
+        # VQA statistics
+        stats['vqa_statistics'] = {
+            'total_questions': total_questions,
+            'avg_questions_per_sample': total_questions / len(data) if len(data) else 0
+        }
         
-        # Sex distribution
-        sexes = [sample.get('sex', 'unknown') for sample in data if sample.get('sex')]
-        if sexes:
-            stats['sex_distribution'] = dict(Counter(sexes))
+        return stats
+    
+    def _get_frame_statistics(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """Get statistics for a data split held as a frame, counting whole columns at once."""
+        
+        def distribution(field: str, default: Any) -> Dict[Any, int]:
+            if field not in data:
+                return {default: len(data)} if len(data) else {}
+            column = self._frame_column(data, field, default)
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                return _category_counts(column)
+            return column.value_counts(sort=False, dropna=False).to_dict()
+        
+        stats = {
+            'dataset_distribution': distribution('dataset_name', 'unknown'),
+            'diagnosis_distribution': distribution('diagnosis', 'unknown')
+        }
         
-        # Anatomical site distribution
-        sites = [sample.get('anatomical_site', 'unknown') for sample in data if sample.get('anatomical_site')]
-        if sites:
-            stats['anatomical_site_distribution'] = dict(Counter(sites))
+        # Sex and anatomical site only count samples where the field is set
+        sex_counts = {sex: count for sex, count in distribution('sex', None).items() if sex}
+        if sex_counts:
+            stats['sex_distribution'] = sex_counts
+        site_counts = {site: count for site, count in distribution('anatomical_site', None).items() if site}
+        if site_counts:
+            stats['anatomical_site_distribution'] = site_counts
         
         # VQA statistics
-        total_questions = sum(len(sample.get('vqa_questions', [])) for sample in data)
+        total_questions = sum(map(len, self._field(data, 'vqa_questions', [])))
         stats['vqa_statistics'] = {
             'total_questions': total_questions,
-            'avg_questions_per_sample': total_questions / len(data) if data else 0
+            'avg_questions_per_sample': total_questions / len(data) if len(data) else 0
         }
         
         return stats
     
-    def analyze_splits(self, split_info_file: Path) -> str:
-        """Analyze the quality of data splits."""
-        if not split_info_file.exists():
-            return f"Split info file not found: {split_info_file}"
+    def analyze_splits(self, split_info: Union[Path, Dict[str, Any]]) -> str:
+        """Analyze the quality of data splits.
         
-        with open(split_info_file, 'r') as f:
-            split_info = json.load(f)
+        split_info is a split info file, or the dict split_dataset returned
+        for it, which saves reading the file back.
+        """
+        if not isinstance(split_info, dict):
+            if not split_info.exists():
+                return f"Split info file not found: {split_info}"
+            split_info = load_json(split_info)
         
         report_lines = [
             "📊 SPLIT ANALYSIS REPORT",
@@ -266,46 +473,52 @@ class DataSplitter:
             ""
         ]
         
+        splits = split_info['splits']
+        
         # Split sizes
         report_lines.append("📈 Split Sizes:")
-        for split_name, split_data in split_info['splits'].items():
+        for split_name, split_data in splits.items():
             report_lines.append(f"  {split_name}: {split_data['samples']} samples ({split_data['percentage']:.1f}%)")
         
         report_lines.append("")
         
         # Diagnosis distribution across splits
         report_lines.append("🏥 Diagnosis Distribution:")
+        diagnosis_counts = [(split_name, split_data['statistics']['diagnosis_distribution'], split_data['samples'])
+                            for split_name, split_data in splits.items()]
         all_diagnoses = set()
-        for split_data in split_info['splits'].values():
-            all_diagnoses.update(split_data['statistics']['diagnosis_distribution'].keys())
+        for _, distribution, _ in diagnosis_counts:
+            all_diagnoses.update(distribution)
         
-        for diagnosis in sorted(all_diagnoses):
+        for diagnosis in sorted(all_diagnoses, key=str):
             report_lines.append(f"  {diagnosis}:")
-            for split_name, split_data in split_info['splits'].items():
-                count = split_data['statistics']['diagnosis_distribution'].get(diagnosis, 0)
-                percentage = count / split_data['samples'] * 100 if split_data['samples'] > 0 else 0
+            for split_name, distribution, n_samples in diagnosis_counts:
+                count = distribution.get(diagnosis, 0)
+                percentage = count / n_samples * 100 if n_samples > 0 else 0
                 report_lines.append(f"    {split_name}: {count} ({percentage:.1f}%)")
         
         report_lines.append("")
         
         # Dataset distribution across splits
         report_lines.append("📚 Dataset Distribution:")
+        dataset_counts = [(split_name, split_data['statistics']['dataset_distribution'], split_data['samples'])
+                          for split_name, split_data in splits.items()]
         all_datasets = set()
-        for split_data in split_info['splits'].values():
-            all_datasets.update(split_data['statistics']['dataset_distribution'].keys())
+        for _, distribution, _ in dataset_counts:
+            all_datasets.update(distribution)
         
-        for dataset in sorted(all_datasets):
+        for dataset in sorted(all_datasets, key=str):
             report_lines.append(f"  {dataset}:")
-            for split_name, split_data in split_info['splits'].items():
-                count = split_data['statistics']['dataset_distribution'].get(dataset, 0)
-                percentage = count / split_data['samples'] * 100 if split_data['samples'] > 0 else 0
+            for split_name, distribution, n_samples in dataset_counts:
+                count = distribution.get(dataset, 0)
+                percentage = count / n_samples * 100 if n_samples > 0 else 0
                 report_lines.append(f"    {split_name}: {count} ({percentage:.1f}%)")
         
         report_lines.append("")
         
         # VQA statistics
         report_lines.append("❓ VQA Statistics:")
-        for split_name, split_data in split_info['splits'].items():
+        for split_name, split_data in splits.items():
             vqa_stats = split_data['statistics']['vqa_statistics']
             report_lines.append(f"  {split_name}:")
             report_lines.append(f"    Total questions: {vqa_stats['total_questions']}")
@@ -4,11 +4,236 @@ Data Validator for Dermatology VQA Dataset
 Validates the quality and consistency of processed metadata.
 """
 
+import os
+import sys
 import json
+import numpy as np
 import pandas as pd
-from pathlib import Path
-from typing import Dict, List, Any, Tuple
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Any, Tuple
+
+try:
+    import orjson  # optional, several times faster than the json module
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Characters of the processed file read at a time while streaming samples
+READ_CHUNK_SIZE = 1 << 20
+
+# Files up to this size are parsed whole with orjson when it is installed; larger ones are streamed
+ORJSON_MAX_FILE_SIZE = 16 << 20
+
+# Names of processed files, written as a JSON array or as JSON Lines
+PROCESSED_SUFFIXES = ('_processed.json', '_processed.jsonl')
+
+
+class NotJSONArrayError(TypeError):
+    """Raised by iter_json_array when the document is valid JSON but not an array."""
+
+
+def iter_json_array(file_path: Path, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array one at a time.
+    
+    Only one chunk of text and the element being decoded are held in memory.
+    Raises json.JSONDecodeError for malformed JSON and NotJSONArrayError when
+    the document is valid JSON but not an array.
+    """
+    decoder = json.JSONDecoder()
+    
+    with open(file_path, 'r') as f:
+        buf, pos, eof = '', 0, False
+        
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+        
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\n\r':
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return
+                fill()
+        
+        skip_whitespace()
+        if buf[pos:pos + 1] != '[':
+            # Not an array: parse the whole document so bad JSON still raises JSONDecodeError
+            json.loads(buf[pos:] + f.read())
+            raise NotJSONArrayError('JSON document is not an array')
+        pos += 1
+        
+        skip_whitespace()
+        if buf[pos:pos + 1] == ']':
+            pos += 1
+        else:
+            while True:
+                # An element is only complete once something follows it in the buffer
+                try:
+                    element, end = decoder.raw_decode(buf, pos)
+                    complete = end < len(buf) or eof
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    complete = False
+                if not complete:
+                    fill()
+                    continue
+                yield element
+                pos = end
+                
+                skip_whitespace()
+                delimiter = buf[pos:pos + 1]
+                pos += 1
+                if delimiter == ']':
+                    break
+                if delimiter != ',':
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos - 1)
+                skip_whitespace()
+        
+        skip_whitespace()
+        if pos < len(buf):
+            raise json.JSONDecodeError('Extra data', buf, pos)
+
+
+# Marks a field absent from a sample, as opposed to present with the value None
+_MISSING = object()
+
+
+def _is_one_of(value: Any, allowed: frozenset) -> bool:
+    """Membership test that treats unhashable values as not allowed instead of raising."""
+    try:
+        return value in allowed
+    except TypeError:
+        return False
+
+
+def iter_jsonl(file_path: Path) -> Iterator[Any]:
+    """Yield the records of a JSON Lines file one line at a time, skipping blank lines."""
+    with open(file_path, 'rb') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            # Lines holding NaN literals go straight to json.loads rather than failing in orjson first
+            loads = orjson.loads if HAS_ORJSON and b'NaN' not in line else json.loads
+            try:
+                record = loads(line)
+            except json.JSONDecodeError:
+                # orjson also rejects Infinity; json.loads accepts it and reports genuinely bad lines
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise json.JSONDecodeError(f'{e.msg} in line {line_number} of the file', e.doc, e.pos) from None
+            yield record
+
+
+def iter_samples(file_path: Path) -> Iterator[Any]:
+    """Yield the samples of a processed file, parsing small files whole with orjson when possible.
+    
+    Files with a .jsonl suffix are read as JSON Lines, one sample per line.
+    """
+    if file_path.suffix == '.jsonl':
+        yield from iter_jsonl(file_path)
+        return
+    
+    if HAS_ORJSON and file_path.stat().st_size <= ORJSON_MAX_FILE_SIZE:
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        # orjson rejects the NaN literals json.dump writes for missing values, so files
+        # holding any are parsed once with json instead
+        loads = json.loads if b'NaN' in raw else orjson.loads
+        try:
+            data = loads(raw)
+        except json.JSONDecodeError:
+            # The stdlib reader below reports genuinely bad JSON
+            pass
+        else:
+            if not isinstance(data, list):
+                raise NotJSONArrayError('JSON document is not an array')
+            yield from data
+            return
+    
+    yield from iter_json_array(file_path)
+
+
+def _intern(value: Any) -> Any:
+    """Intern string values, so the collector keeps one copy of each label instead of one per sample."""
+    return sys.intern(value) if type(value) is str else value
+
+
+class StatisticsCollector:
+    """Accumulates dataset statistics one sample at a time."""
+    
+    def __init__(self):
+        # Values are only collected per sample; counting happens column-wise in statistics()
+        self.n_samples = 0
+        self.dataset_names = []
+        self.diagnoses = []
+        self.sexes = []
+        self.sites = []
+        self.ages = []
+        self.total_questions = 0
+    
+    def add(self, sample: Dict[str, Any]) -> None:
+        """Count one sample."""
+        self.n_samples += 1
+        self.dataset_names.append(_intern(sample.get('dataset_name', 'unknown')))
+        self.diagnoses.append(_intern(sample.get('diagnosis', 'unknown')))
+        
+        sex = sample.get('sex')
+        if sex:
+            self.sexes.append(_intern(sex))
+        
+        site = sample.get('anatomical_site')
+        if site:
+            self.sites.append(_intern(site))
+        
+        age = sample.get('age')
+        if age is not None and (isinstance(age, (int, float)) or str(age).replace('.', '').isdigit()):
+            self.ages.append(float(age))
+        
+        self.total_questions += len(sample.get('vqa_questions', []))
+    
+    def statistics(self) -> Dict[str, Any]:
+        """Return the statistics of every sample added so far."""
+        stats = {
+            'dataset_distribution': self._value_counts(self.dataset_names),
+            'diagnosis_distribution': self._value_counts(self.diagnoses),
+            'sex_distribution': self._value_counts(self.sexes),
+            'anatomical_site_distribution': self._value_counts(self.sites)
+        }
+        
+        # Age statistics, reduced over one contiguous float64 array
+        if self.ages:
+            ages = np.array(self.ages, dtype=np.float64)
+            stats['age_statistics'] = {
+                'count': int(ages.size),
+                'mean': float(ages.mean()),
+                'min': float(ages.min()),
+                'max': float(ages.max()),
+                # Upper median, selected in linear time rather than by sorting
+                'median': float(np.partition(ages, ages.size // 2)[ages.size // 2])
+            }
+        
+        # VQA question statistics
+        stats['vqa_statistics'] = {
+            'total_questions': self.total_questions,
+            'avg_questions_per_sample': self.total_questions / self.n_samples if self.n_samples else 0
+        }
+        
+        return stats
+    
+    @staticmethod
+    def _value_counts(values: List[Any]) -> Dict[Any, int]:
+        """Count values in one hashed pass, keyed in order of first appearance like Counter."""
+        # Object dtype keeps None and NaN apart as distinct keys, as Counter does
+        return pd.Series(values, dtype=object).value_counts(sort=False, dropna=False).to_dict()
 
 
 class DataValidator:
@@ -30,79 +255,99 @@ class DataValidator:
             'genitalia', 'unknown', None
         ]
     
+    def _lookup_sets(self) -> Tuple[frozenset, frozenset, frozenset, frozenset]:
+        """Hashed copies of the field and value lists, built from their current contents."""
+        return (
+            frozenset(self.required_fields), frozenset(self.valid_diagnoses),
+            frozenset(self.valid_sexes), frozenset(self.valid_anatomical_sites)
+        )
+    
     def validate_file(self, file_path: Path) -> Dict[str, Any]:
         """Validate a single processed JSON file."""
-        if not file_path.exists():
-            return {'error': f'File not found: {file_path}'}
-        
-        try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-        except json.JSONDecodeError as e:
-            return {'error': f'Invalid JSON: {e}'}
-        
-        if not isinstance(data, list):
-            return {'error': 'Data should be a list of samples'}
-        
         validation_results = {
             'file_path': str(file_path),
-            'total_samples': len(data),
+            'total_samples': 0,
             'valid_samples': 0,
             'errors': [],
             'warnings': [],
             'statistics': {}
         }
+        statistics = StatisticsCollector()
+        # Built once per file so the per-sample checks see any edits to the lists
+        lookups = self._lookup_sets()
         
-        for i, sample in enumerate(data):
-            sample_errors, sample_warnings = self.validate_sample(sample, i)
-            validation_results['errors'].extend(sample_errors)
-            validation_results['warnings'].extend(sample_warnings)
-            
-            if not sample_errors:
-                validation_results['valid_samples'] += 1
+        # Validate samples as they are decoded rather than loading the whole file first
+        try:
+            for i, sample in enumerate(iter_samples(file_path)):
+                sample_errors, sample_warnings = self._validate_sample(sample, i, lookups)
+                validation_results['errors'].extend(sample_errors)
+                validation_results['warnings'].extend(sample_warnings)
+                
+                if not sample_errors:
+                    validation_results['valid_samples'] += 1
+                
+                statistics.add(sample)
+        except FileNotFoundError:
+            # Reported on open rather than by a separate exists() check
+            return {'error': f'File not found: {file_path}'}
+        except json.JSONDecodeError as e:
+            return {'error': f'Invalid JSON: {e}'}
+        except NotJSONArrayError:
+            return {'error': 'Data should be a list of samples'}
         
         # Generate statistics
-        validation_results['statistics'] = self.generate_statistics(data)
+        validation_results['total_samples'] = statistics.n_samples
+        validation_results['statistics'] = statistics.statistics()
         
         return validation_results
     
     def validate_sample(self, sample: Dict[str, Any], index: int) -> Tuple[List[str], List[str]]:
         """Validate a single sample."""
+        return self._validate_sample(sample, index, self._lookup_sets())
+    
+    def _validate_sample(self, sample: Dict[str, Any], index: int,
+                         lookups: Tuple[frozenset, frozenset, frozenset, frozenset]) -> Tuple[List[str], List[str]]:
+        """Validate a single sample against sets from _lookup_sets."""
+        required_fields, valid_diagnoses, valid_sexes, valid_anatomical_sites = lookups
         errors = []
         warnings = []
         
         # Check required fields
-        for field in self.required_fields:
-            if field not in sample:
-                errors.append(f"Sample {index}: Missing required field '{field}'")
-        
-        # Validate specific fields
-        if 'diagnosis' in sample:
-            if sample['diagnosis'] not in self.valid_diagnoses:
-                warnings.append(f"Sample {index}: Unusual diagnosis '{sample['diagnosis']}'")
-        
-        if 'sex' in sample:
-            if sample['sex'] not in self.valid_sexes:
-                warnings.append(f"Sample {index}: Unusual sex value '{sample['sex']}'")
-        
-        if 'anatomical_site' in sample:
-            if sample['anatomical_site'] not in self.valid_anatomical_sites:
-                warnings.append(f"Sample {index}: Unusual anatomical site '{sample['anatomical_site']}'")
-        
-        if 'age' in sample and sample['age'] is not None:
+        missing = required_fields - sample.keys()
+        if missing:
+            for field in self.required_fields:
+                if field in missing:
+                    errors.append(f"Sample {index}: Missing required field '{field}'")
+        
+        # Validate specific fields, looking each one up only once
+        diagnosis = sample.get('diagnosis', _MISSING)
+        if diagnosis is not _MISSING and not _is_one_of(diagnosis, valid_diagnoses):
+            warnings.append(f"Sample {index}: Unusual diagnosis '{diagnosis}'")
+        
+        sex = sample.get('sex', _MISSING)
+        if sex is not _MISSING and not _is_one_of(sex, valid_sexes):
+            warnings.append(f"Sample {index}: Unusual sex value '{sex}'")
+        
+        site = sample.get('anatomical_site', _MISSING)
+        if site is not _MISSING and not _is_one_of(site, valid_anatomical_sites):
+            warnings.append(f"Sample {index}: Unusual anatomical site '{site}'")
+        
+        age = sample.get('age')
+        if age is not None:
             try:
-                age = float(sample['age'])
+                age = float(age)
                 if age < 0 or age > 150:
                     warnings.append(f"Sample {index}: Unusual age value {age}")
             except (ValueError, TypeError):
-                errors.append(f"Sample {index}: Invalid age format '{sample['age']}'")
+                errors.append(f"Sample {index}: Invalid age format '{age}'")
         
         # Validate VQA questions
-        if 'vqa_questions' in sample:
-            if not isinstance(sample['vqa_questions'], list):
+        vqa_questions = sample.get('vqa_questions', _MISSING)
+        if vqa_questions is not _MISSING:
+            if not isinstance(vqa_questions, list):
                 errors.append(f"Sample {index}: vqa_questions should be a list")
             else:
-                for j, qa in enumerate(sample['vqa_questions']):
+                for j, qa in enumerate(vqa_questions):
                     if not isinstance(qa, dict):
                         errors.append(f"Sample {index}, QA {j}: Should be a dictionary")
                         continue
@@ -110,93 +355,81 @@ class DataValidator:
                     if 'question' not in qa or 'answer' not in qa:
                         errors.append(f"Sample {index}, QA {j}: Missing 'question' or 'answer'")
                     
-                    if not qa.get('question', '').strip():
+                    # isspace() tests without the copy strip() makes of padded text;
+                    # a NaN answer (missing in the source metadata) also counts as empty
+                    question = qa.get('question')
+                    if not question or (question.isspace() if isinstance(question, str) else question != question):
                         warnings.append(f"Sample {index}, QA {j}: Empty question")
                     
-                    if not qa.get('answer', '').strip():
+                    answer = qa.get('answer')
+                    if not answer or (answer.isspace() if isinstance(answer, str) else answer != answer):
                         warnings.append(f"Sample {index}, QA {j}: Empty answer")
         
         # Validate image path
-        if 'image_path' in sample:
-            if not sample['image_path'] or not sample['image_path'].strip():
+        image_path = sample.get('image_path', _MISSING)
+        if image_path is not _MISSING:
+            if not image_path or not image_path.strip():
                 errors.append(f"Sample {index}: Empty image path")
         
         return errors, warnings
     
     def generate_statistics(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Generate statistics for the dataset."""
-        stats = {}
-        
-        # Dataset distribution
-        datasets = [sample.get('dataset_name', 'unknown') for sample in data]
-        stats['dataset_distribution'] = dict(Counter(datasets))
-        
-        # Diagnosis distribution
-        diagnoses = [sample.get('diagnosis', 'unknown') for sample in data]
-        stats['diagnosis_distribution'] = dict(Counter(diagnoses))
-        
-        # Sex distribution
-        sexes = [sample.get('sex', 'unknown') for sample in data if sample.get('sex')]
-        stats['sex_distribution'] = dict(Counter(sexes))
-        
-        # Anatomical site distribution
-        sites = [sample.get('anatomical_site', 'unknown') for sample in data if sample.get('anatomical_site')]
-        stats['anatomical_site_distribution'] = dict(Counter(sites))
-        
-        # Age statistics
-        ages = [sample.get('age') for sample in data if sample.get('age') is not None]
-        if ages:
-            ages = [float(age) for age in ages if isinstance(age, (int, float)) or str(age).replace('.', '').isdigit()]
-            if ages:
-                stats['age_statistics'] = {
-                    'count': len(ages),
-                    'mean': sum(ages) / len(ages),
-                    'min': min(ages),
-                    'max': max(ages),
-                    'median': sorted(ages)[len(ages)//2]
-                }
-        
-        # VQA question statistics
-        total_questions = sum(len(sample.get('vqa_questions', [])) for sample in data)
-        stats['vqa_statistics'] = {
-            'total_questions': total_questions,
-            'avg_questions_per_sample': total_questions / len(data) if data else 0
-        }
-        
-        return stats
+        statistics = StatisticsCollector()
+        for sample in data:
+            statistics.add(sample)
+        return statistics.statistics()
     
     def validate_directory(self, directory: Path) -> Dict[str, Any]:
         """Validate all processed JSON files in a directory."""
-        if not directory.exists():
+        # One directory scan; names are matched as glob('*_processed.json') and
+        # glob('*_processed.jsonl') would
+        try:
+            with os.scandir(directory) as entries:
+                json_files = [
+                    Path(entry.path) for entry in entries
+                    if entry.name.endswith(PROCESSED_SUFFIXES) and not entry.name.startswith('.') and entry.is_file()
+                ]
+        except FileNotFoundError:
             return {'error': f'Directory not found: {directory}'}
         
-        json_files = list(directory.glob('*_processed.json'))
         if not json_files:
             return {'error': 'No processed JSON files found'}
         
+        # Files are independent, so validate them in parallel worker processes
+        max_workers = min(len(json_files), os.cpu_count() or 1)
+        # Each worker receives this validator once and reuses it for every file it handles
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(self,)) as executor:
+            all_file_results = list(executor.map(_validate_file_worker, json_files))
+        
+        # Sum the (samples, valid, errors, warnings) counts of every file that could be read
+        counts = [
+            (file_results['total_samples'], file_results['valid_samples'],
+             len(file_results['errors']), len(file_results['warnings']))
+            for file_results in all_file_results if 'error' not in file_results
+        ]
+        total_samples, total_valid_samples, total_errors, total_warnings = map(sum, zip(*counts)) if counts else (0, 0, 0, 0)
+        
+        # Results are keyed by dataset name; a dataset written both as JSON and as JSON Lines
+        # has its files keyed by file name so neither result replaces the other
+        dataset_names = [json_file.stem.replace('_processed', '') for json_file in json_files]
+        n_files_per_dataset = Counter(dataset_names)
+        
         overall_results = {
             'directory': str(directory),
             'total_files': len(json_files),
-            'file_results': {},
+            'file_results': {
+                dataset_name if n_files_per_dataset[dataset_name] == 1 else json_file.name: file_results
+                for json_file, dataset_name, file_results in zip(json_files, dataset_names, all_file_results)
+            },
             'summary': {
-                'total_samples': 0,
-                'total_valid_samples': 0,
-                'total_errors': 0,
-                'total_warnings': 0
+                'total_samples': total_samples,
+                'total_valid_samples': total_valid_samples,
+                'total_errors': total_errors,
+                'total_warnings': total_warnings
             }
         }
         
-        for json_file in json_files:
-            file_results = self.validate_file(json_file)
-            dataset_name = json_file.stem.replace('_processed', '')
-            overall_results['file_results'][dataset_name] = file_results
-            
-            if 'error' not in file_results:
-                overall_results['summary']['total_samples'] += file_results['total_samples']
-                overall_results['summary']['total_valid_samples'] += file_results['valid_samples']
-                overall_results['summary']['total_errors'] += len(file_results['errors'])
-                overall_results['summary']['total_warnings'] += len(file_results['warnings'])
-        
         return overall_results
     
     def generate_report(self, validation_results: Dict[str, Any], output_file: Path = None) -> str:
@@ -272,38 +505,28 @@ class DataValidator:
         
         # Show errors and warnings
         if 'file_results' in validation_results:
-            # Collect all errors and warnings from all files
-            all_errors = []
-            all_warnings = []
-            for file_result in validation_results['file_results'].values():
-                if 'errors' in file_result:
-                    all_errors.extend(file_result['errors'])
-                if 'warnings' in file_result:
-                    all_warnings.extend(file_result['warnings'])
+            # Chain the per-file lists rather than copying every message into one list
+            file_results = validation_results['file_results'].values()
+            all_errors = [file_result['errors'] for file_result in file_results if 'errors' in file_result]
+            all_warnings = [file_result['warnings'] for file_result in file_results if 'warnings' in file_result]
         else:
-            all_errors = validation_results.get('errors', [])
-            all_warnings = validation_results.get('warnings', [])
-        
-        if all_errors:
-            report_lines.extend([
-                "❌ ERRORS",
-                "-" * 20
-            ])
-            for error in all_errors[:10]:  # Show first 10 errors
-                report_lines.append(f"  • {error}")
-            if len(all_errors) > 10:
-                report_lines.append(f"  ... and {len(all_errors) - 10} more errors")
-            report_lines.append("")
-        
-        if all_warnings:
+            all_errors = [validation_results.get('errors', [])]
+            all_warnings = [validation_results.get('warnings', [])]
+        
+        for title, label, messages in (("❌ ERRORS", 'errors', all_errors),
+                                       ("⚠️  WARNINGS", 'warnings', all_warnings)):
+            n_messages = sum(len(file_messages) for file_messages in messages)
+            if not n_messages:
+                continue
+            
             report_lines.extend([
-                "⚠️  WARNINGS",
+                title,
                 "-" * 20
             ])
-            for warning in all_warnings[:10]:  # Show first 10 warnings
-                report_lines.append(f"  • {warning}")
-            if len(all_warnings) > 10:
-                report_lines.append(f"  ... and {len(all_warnings) - 10} more warnings")
+            for message in islice(chain.from_iterable(messages), 10):  # Show first 10
+                report_lines.append(f"  • {message}")
+            if n_messages > 10:
+                report_lines.append(f"  ... and {n_messages - 10} more {label}")
             report_lines.append("")
         
         report = '\n'.join(report_lines)
@@ -316,6 +539,21 @@ class DataValidator:
         return report
 
 
+# Validator used by _validate_file_worker, set in each worker process by _init_worker
+_worker_validator = None
+
+
+def _init_worker(validator: DataValidator) -> None:
+    """Keep the validating DataValidator in a worker process started by validate_directory."""
+    global _worker_validator
+    _worker_validator = validator
+
+
+def _validate_file_worker(file_path: Path) -> Dict[str, Any]:
+    """Validate one file in a worker process for DataValidator.validate_directory."""
+    return _worker_validator.validate_file(file_path)
+
+
 def main():
     """Main function for command-line usage."""
     import argparse
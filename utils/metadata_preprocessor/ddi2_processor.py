@@ -5,7 +5,10 @@ DDI2 Dataset Processor
 import pandas as pd
 from pathlib import Path
 from typing import Dict, List, Any
-from base_processor import BaseProcessor
+try:
+    from .base_processor import BaseProcessor
+except ImportError:  # run as a script from this directory
+    from base_processor import BaseProcessor
 
 
 class DDI2Processor(BaseProcessor):
@@ -24,35 +27,40 @@ class DDI2Processor(BaseProcessor):
         
         # Read the Excel file
         try:
-            df = pd.read_excel(metadata_file)
+            df = self.read_excel(metadata_file)
         except Exception as e:
             print(f"Error reading DDI2 metadata: {e}")
             return []
         
+        # Standardize each field column-wise, so every distinct value is normalized once
+        diagnoses = self.standardize_diagnosis_series(self._column(df, 'diagnosis', 'disease', default='unknown')).tolist()
+        ages = self.standardize_age_series(self._column(df, 'age')).tolist()
+        sexes = self.standardize_sex_series(self._column(df, 'sex', 'gender')).tolist()
+        sites = self.standardize_anatomical_site_series(self._column(df, 'anatomical_site', 'location')).tolist()
+        question_lists = self.generate_vqa_questions_batch(diagnoses, ages, sexes, sites)
+        
         processed_samples = []
         
-        for _, row in df.iterrows():
+        # Convert the sheet to plain dicts in one pass instead of building a Series per row
+        for i, row in enumerate(df.to_dict('records')):
             # Create image path (assuming filename column exists)
             image_path = f"images/{row.get('filename', row.get('image_id', 'unknown'))}"
             
-            # Extract additional metadata
-            additional_metadata = {
-                'original_data': dict(row)
+            sample = {
+                'dataset_name': self.dataset_name,
+                'sample_id': str(row.get('id', row.get('image_id', i))),
+                'image_path': image_path,
+                'diagnosis': diagnoses[i],
+                'age': ages[i],
+                'sex': sexes[i],
+                'anatomical_site': sites[i],
+                'metadata': {
+                    'original_data': row
+                }
             }
             
-            # Create standardized sample
-            sample = self.create_standardized_sample(
-                sample_id=str(row.get('id', row.get('image_id', len(processed_samples)))),
-                image_path=image_path,
-                diagnosis=row.get('diagnosis', row.get('disease', 'unknown')),
-                age=row.get('age'),
-                sex=row.get('sex', row.get('gender')),
-                anatomical_site=row.get('anatomical_site', row.get('location')),
-                additional_metadata=additional_metadata
-            )
-            
             # Add VQA questions
-            sample['vqa_questions'] = self.generate_vqa_questions(sample)
+            sample['vqa_questions'] = question_lists[i]
             
             processed_samples.append(sample)
         
@@ -5,7 +5,10 @@ DDI Dataset Processor
 import pandas as pd
 from pathlib import Path
 from typing import Dict, List, Any
-from base_processor import BaseProcessor
+try:
+    from .base_processor import BaseProcessor, QUESTION_TEXT
+except ImportError:  # run as a script from this directory
+    from base_processor import BaseProcessor, QUESTION_TEXT
 
 
 class DDIProcessor(BaseProcessor):
@@ -25,48 +28,58 @@ class DDIProcessor(BaseProcessor):
         # Read the metadata file
         df = self.read_csv_safely(metadata_file)
         
+        if df.empty:
+            return []
+        
+        # Pull every column out once instead of boxing a Series per row
+        ddi_ids = df['DDI_ID'].tolist()
+        image_paths = [f"images/{ddi_file}" for ddi_file in df['DDI_file'].tolist()]
+        skin_tones = df['skin_tone'].tolist()
+        malignant = df['malignant'].tolist()
+        has_malignant = df['malignant'].notna().tolist()
+        skin_tone_answers = {tone: f"Skin tone: {tone}" for tone in dict.fromkeys(skin_tones) if tone}
+        
+        # Age, sex and anatomical site are not available in DDI
+        diagnoses = self.standardize_diagnosis_series(df['disease']).tolist()
+        missing = [None] * len(df)
+        question_lists = self.generate_vqa_questions_batch(diagnoses, missing, missing, missing)
+        
         processed_samples = []
         
-        for _, row in df.iterrows():
-            # Create image path
-            image_path = f"images/{row['DDI_file']}"
-            
-            # Extract additional metadata
-            additional_metadata = {
-                'ddi_id': row['DDI_ID'],
-                'skin_tone': row['skin_tone'],
-                'malignant': row['malignant']
+        for i, ddi_id in enumerate(ddi_ids):
+            sample = {
+                'dataset_name': self.dataset_name,
+                'sample_id': str(ddi_id),
+                'image_path': image_paths[i],
+                'diagnosis': diagnoses[i],
+                'age': None,
+                'sex': None,
+                'anatomical_site': None,
+                'metadata': {
+                    'ddi_id': ddi_id,
+                    'skin_tone': skin_tones[i],
+                    'malignant': malignant[i]
+                }
             }
             
-            # Create standardized sample
-            sample = self.create_standardized_sample(
-                sample_id=str(row['DDI_ID']),
-                image_path=image_path,
-                diagnosis=row['disease'],
-                age=None,  # Age not available in DDI
-                sex=None,  # Sex not available in DDI
-                anatomical_site=None,  # Anatomical site not available in DDI
-                additional_metadata=additional_metadata
-            )
-            
             # Add VQA questions
-            sample['vqa_questions'] = self.generate_vqa_questions(sample)
+            questions = question_lists[i]
             
             # Add skin tone specific questions
-            if row['skin_tone']:
-                sample['vqa_questions'].append({
+            if skin_tones[i]:
+                questions.append({
                     'question': 'What is the skin tone of this patient?',
-                    'answer': f"Skin tone: {row['skin_tone']}"
+                    'answer': skin_tone_answers[skin_tones[i]]
                 })
             
             # Add malignancy questions
-            if pd.notna(row['malignant']):
-                malignant_answer = 'Yes' if row['malignant'] else 'No'
-                sample['vqa_questions'].append({
-                    'question': 'Is this lesion malignant?',
-                    'answer': malignant_answer
+            if has_malignant[i]:
+                questions.append({
+                    'question': QUESTION_TEXT['malignant'],
+                    'answer': 'Yes' if malignant[i] else 'No'
                 })
             
+            sample['vqa_questions'] = questions
             processed_samples.append(sample)
         
         return processed_samples 
\ No newline at end of file
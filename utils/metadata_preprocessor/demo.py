@@ -4,10 +4,12 @@ Demo Script for Dermatology VQA Dataset Preprocessing Pipeline
 Demonstrates the complete workflow from raw metadata to VQA-ready splits.
 """
 
+import os
 import json
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, List, Any
 
 # Add the current directory to Python path
 sys.path.append(str(Path(__file__).parent))
@@ -35,8 +37,11 @@ class VQAPipeline:
         self.splits_dir = self.output_dir / "splits"
         self.reports_dir = self.output_dir / "reports"
         
-        for dir_path in [self.processed_dir, self.enriched_dir, self.splits_dir, self.reports_dir]:
-            dir_path.mkdir(parents=True, exist_ok=True)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # The subdirectories share that parent, so their mkdir round trips can overlap
+        subdirs = [self.processed_dir, self.enriched_dir, self.splits_dir, self.reports_dir]
+        with ThreadPoolExecutor(max_workers=len(subdirs)) as executor:
+            list(executor.map(lambda dir_path: dir_path.mkdir(exist_ok=True), subdirs))
     
     def run_complete_pipeline(self, dataset_name: str = None) -> Dict[str, Any]:
         """Run the complete VQA preprocessing pipeline."""
@@ -102,33 +107,37 @@ class VQAPipeline:
             print("\n❓ Step 3: Enriching VQA Questions")
             print("-" * 30)
             
-            processed_files = list((self.base_dir / "processed_metadata").glob("*_processed.json"))
+            processed_files = _scan(self.base_dir / "processed_metadata", "_processed.json")
             if not processed_files:
                 print("❌ No processed files found for enrichment")
                 results['errors'].append("No processed files found for enrichment")
                 return results
             
-            # For demo, enrich the first file or specific dataset
-            target_file = processed_files[0]
+            # Enrich every processed file (or those of the requested dataset) in parallel;
+            # the first one is carried through the remaining steps
+            target_files = processed_files
             if dataset_name:
-                target_files = [f for f in processed_files if dataset_name in f.name]
-                if target_files:
-                    target_file = target_files[0]
+                target_files = [f for f in processed_files if dataset_name in f.name] or processed_files
+            enriched_files = [self.enriched_dir / f"{f.stem}_enriched.json" for f in target_files]
             
-            enriched_file = self.enriched_dir / f"{target_file.stem}_enriched.json"
-            enrich_stats = self.enricher.enrich_dataset(target_file, enriched_file, max_new_questions=8)
+            max_workers = min(len(target_files), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                all_enrich_stats = list(executor.map(_enrich_file, target_files, enriched_files))
             
-            if 'error' not in enrich_stats:
+            for target_file, enrich_stats in zip(target_files, all_enrich_stats):
+                if 'error' in enrich_stats:
+                    print(f"❌ Enrichment failed: {enrich_stats['error']}")
+                    results['errors'].append(f"Enrichment: {enrich_stats['error']}")
+                    return results
+                
                 print(f"✅ Enrichment completed for {target_file.name}")
                 print(f"   Original questions: {enrich_stats['total_original_questions']}")
                 print(f"   New questions: {enrich_stats['total_new_questions']}")
                 print(f"   Avg questions per sample: {enrich_stats['avg_questions_per_sample_after']:.1f}")
-                results['outputs']['enriched_file'] = str(enriched_file)
-                results['steps_completed'].append('enrichment')
-            else:
-                print(f"❌ Enrichment failed: {enrich_stats['error']}")
-                results['errors'].append(f"Enrichment: {enrich_stats['error']}")
-                return results
+            
+            enriched_file = enriched_files[0]
+            results['outputs']['enriched_file'] = str(enriched_file)
+            results['steps_completed'].append('enrichment')
             
             # Step 4: Create train/validation/test splits
             print("\n🔄 Step 4: Creating Data Splits")
@@ -152,7 +161,7 @@ class VQAPipeline:
                 
                 # Generate split analysis report
                 split_info_file = self.splits_dir / f"{enriched_file.stem}_split_info.json"
-                split_report = self.splitter.analyze_splits(split_info_file)
+                split_report = self.splitter.analyze_splits(split_info)
                 split_report_file = self.reports_dir / "split_analysis_report.txt"
                 with open(split_report_file, 'w') as f:
                     f.write(split_report)
@@ -169,9 +178,10 @@ class VQAPipeline:
             print("\n🔍 Step 5: Final Validation")
             print("-" * 30)
             
-            split_files = list(self.splits_dir.glob("*_train.json"))
-            if split_files:
-                final_validation = self.validator.validate_file(split_files[0])
+            # The splitter reports the files it wrote, so the splits directory is not scanned again
+            train_split = split_info['splits'].get('train')
+            if train_split:
+                final_validation = self.validator.validate_file(Path(train_split['file']))
                 if 'error' not in final_validation:
                     print(f"✅ Final validation passed")
                     print(f"   Training set: {final_validation['valid_samples']}/{final_validation['total_samples']} valid samples")
@@ -285,6 +295,22 @@ class VQAPipeline:
             print(f"  Check outputs in: {self.output_dir}")
 
 
+def _scan(directory: Path, suffix: str) -> List[Path]:
+    """Return the files in directory whose names end with suffix, like glob('*' + suffix)."""
+    try:
+        with os.scandir(directory) as entries:
+            return [Path(entry.path) for entry in entries
+                    if entry.name.endswith(suffix) and not entry.name.startswith('.')]
+    except FileNotFoundError:
+        return []
+
+
+def _enrich_file(input_file: Path, output_file: Path) -> Dict[str, Any]:
+    """Enrich one processed file in a worker process for VQAPipeline.run_complete_pipeline."""
+    # Files are already enriched in parallel, so each one is enriched in this worker alone
+    return VQAEnricher().enrich_dataset(input_file, output_file, max_new_questions=8, max_workers=1)
+
+
 def main():
     """Main function for demo script."""
     import argparse
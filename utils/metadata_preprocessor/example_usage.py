@@ -4,6 +4,7 @@ Example usage of the metadata preprocessor for dermatology VQA dataset creation.
 """
 
 import json
+from collections import Counter
 from pathlib import Path
 from main import MetadataPreprocessor
 
@@ -79,22 +80,16 @@ def example_combine_datasets():
     
     # Display statistics
     if combined_data:
-        datasets = {}
-        diagnoses = {}
-        
-        for sample in combined_data:
-            dataset_name = sample.get('dataset_name', 'unknown')
-            diagnosis = sample.get('diagnosis', 'unknown')
-            
-            datasets[dataset_name] = datasets.get(dataset_name, 0) + 1
-            diagnoses[diagnosis] = diagnoses.get(diagnosis, 0) + 1
+        # Counter tallies each generator in C
+        datasets = Counter(sample.get('dataset_name', 'unknown') for sample in combined_data)
+        diagnoses = Counter(sample.get('diagnosis', 'unknown') for sample in combined_data)
         
         print("\nDataset distribution:")
         for dataset, count in sorted(datasets.items()):
             print(f"  {dataset}: {count} samples")
         
         print("\nDiagnosis distribution:")
-        for diagnosis, count in sorted(diagnoses.items(), key=lambda x: x[1], reverse=True):
+        for diagnosis, count in diagnoses.most_common():
             print(f"  {diagnosis}: {count} samples")
 
 def example_custom_processor():
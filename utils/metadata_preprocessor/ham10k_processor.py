@@ -4,8 +4,50 @@ HAM10K Dataset Processor
 
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Any
-from base_processor import BaseProcessor
+from typing import Dict, Iterator, List, Any
+try:
+    from .base_processor import BaseProcessor
+except ImportError:  # run as a script from this directory
+    from base_processor import BaseProcessor
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv  # multithreaded CSV reader
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+# Map HAM10K diagnosis codes to standard format
+DIAGNOSIS_MAPPING = {
+    'akiec': 'actinic_keratosis',
+    'bcc': 'basal_cell_carcinoma',
+    'bkl': 'benign_keratosis',
+    'df': 'dermatofibroma',
+    'mel': 'melanoma',
+    'nv': 'nevus',
+    'vasc': 'vascular_lesion'
+}
+
+# Map anatomical sites
+ANATOMICAL_MAPPING = {
+    'abdomen': 'trunk',
+    'back': 'trunk',
+    'chest': 'trunk',
+    'ear': 'head_neck',
+    'face': 'head_neck',
+    'foot': 'lower_extremity',
+    'hand': 'upper_extremity',
+    'lower leg': 'lower_extremity',
+    'neck': 'head_neck',
+    'scalp': 'head_neck',
+    'trunk': 'trunk',
+    'upper leg': 'lower_extremity',
+    'acral': 'lower_extremity'  # Acral sites (hands/feet)
+}
+
+# Low-cardinality columns of the metadata file
+CATEGORICAL_COLUMNS = ('dx', 'dx_type', 'sex', 'localization', 'dataset')
 
 
 class HAM10KProcessor(BaseProcessor):
@@ -16,6 +58,20 @@ class HAM10KProcessor(BaseProcessor):
     
     def process(self, dataset_path: Path) -> List[Dict[str, Any]]:
         """Process HAM10K dataset metadata."""
+        return list(self.iter_samples(dataset_path))
+    
+    def read_metadata(self, metadata_file: Path) -> pd.DataFrame:
+        """Read the metadata CSV, with label columns as categoricals since they repeat a handful of values."""
+        if not HAS_PYARROW:
+            return pd.read_csv(metadata_file, dtype=dict.fromkeys(CATEGORICAL_COLUMNS, 'category'))
+        
+        # Arrow dictionary columns become pandas categoricals
+        convert_options = pa_csv.ConvertOptions(
+            column_types=dict.fromkeys(CATEGORICAL_COLUMNS, pa.dictionary(pa.int32(), pa.string())))
+        return pa_csv.read_csv(metadata_file, convert_options=convert_options).to_pandas()
+    
+    def iter_samples(self, dataset_path: Path) -> Iterator[Dict[str, Any]]:
+        """Yield HAM10K samples as they are built so writers can stream them."""
         
         # Look for the metadata file
         metadata_file = dataset_path / 'HAM10000_metadata'
@@ -23,7 +79,7 @@ class HAM10KProcessor(BaseProcessor):
             raise FileNotFoundError(f"Metadata file not found: {metadata_file}")
         
         # Read the metadata file (CSV with header)
-        df = pd.read_csv(metadata_file)
+        df = self.read_metadata(metadata_file)
         
         # Rename columns to match expected format
         df = df.rename(columns={
@@ -33,64 +89,43 @@ class HAM10KProcessor(BaseProcessor):
             'dx_type': 'diagnosis_type'
         })
         
-        processed_samples = []
+        # Pull every column out once instead of boxing a Series per row
+        ham_ids = df['ham_id'].tolist()
+        isic_ids = df['isic_id'].tolist()
+        diagnosis_types = df['diagnosis_type'].tolist()
+        dataset_sources = df['dataset'].tolist()
+        original_diagnoses = df['diagnosis'].tolist()
+        original_localizations = df['localization'].tolist()
         
-        for _, row in df.iterrows():
-            # Create image path (assuming images are in a subdirectory)
-            image_path = f"images/{row['isic_id']}.jpg"
-            
-            # Map HAM10K diagnosis codes to standard format
-            diagnosis_mapping = {
-                'akiec': 'actinic_keratosis',
-                'bcc': 'basal_cell_carcinoma',
-                'bkl': 'benign_keratosis',
-                'df': 'dermatofibroma',
-                'mel': 'melanoma',
-                'nv': 'nevus',
-                'vasc': 'vascular_lesion'
-            }
-            
-            # Map anatomical sites
-            anatomical_mapping = {
-                'abdomen': 'trunk',
-                'back': 'trunk',
-                'chest': 'trunk',
-                'ear': 'head_neck',
-                'face': 'head_neck',
-                'foot': 'lower_extremity',
-                'hand': 'upper_extremity',
-                'lower leg': 'lower_extremity',
-                'neck': 'head_neck',
-                'scalp': 'head_neck',
-                'trunk': 'trunk',
-                'upper leg': 'lower_extremity',
-                'acral': 'lower_extremity'  # Acral sites (hands/feet)
-            }
-            
-            # Extract additional metadata
-            additional_metadata = {
-                'ham_id': row['ham_id'],
-                'isic_id': row['isic_id'],
-                'diagnosis_type': row['diagnosis_type'],
-                'dataset_source': row['dataset'],
-                'original_diagnosis': row['diagnosis'],
-                'original_localization': row['localization']
+        # Map and standardize whole columns; codes missing from a mapping pass through unchanged.
+        # Mapping a categorical calls the function once per category rather than once per row
+        diagnoses = self.standardize_diagnosis_series(
+            df['diagnosis'].map(lambda code: DIAGNOSIS_MAPPING.get(code, code))).tolist()
+        ages = self.standardize_age_series(df['age']).tolist()
+        sexes = self.standardize_sex_series(df['sex']).tolist()
+        sites = self.standardize_anatomical_site_series(
+            df['localization'].map(lambda site: ANATOMICAL_MAPPING.get(site, site))).tolist()
+        question_lists = self.generate_vqa_questions_batch(diagnoses, ages, sexes, sites)
+        
+        for i, ham_id in enumerate(ham_ids):
+            sample = {
+                'dataset_name': self.dataset_name,
+                'sample_id': ham_id,
+                # Images are assumed to be in a subdirectory
+                'image_path': f"images/{isic_ids[i]}.jpg",
+                'diagnosis': diagnoses[i],
+                'age': ages[i],
+                'sex': sexes[i],
+                'anatomical_site': sites[i],
+                'metadata': {
+                    'ham_id': ham_id,
+                    'isic_id': isic_ids[i],
+                    'diagnosis_type': diagnosis_types[i],
+                    'dataset_source': dataset_sources[i],
+                    'original_diagnosis': original_diagnoses[i],
+                    'original_localization': original_localizations[i]
+                },
+                'vqa_questions': question_lists[i]
             }
             
-            # Create standardized sample
-            sample = self.create_standardized_sample(
-                sample_id=row['ham_id'],
-                image_path=image_path,
-                diagnosis=diagnosis_mapping.get(row['diagnosis'], row['diagnosis']),
-                age=row['age'],
-                sex=row['sex'],
-                anatomical_site=anatomical_mapping.get(row['localization'], row['localization']),
-                additional_metadata=additional_metadata
-            )
-            
-            # Add VQA questions
-            sample['vqa_questions'] = self.generate_vqa_questions(sample)
-            
-            processed_samples.append(sample)
-        
-        return processed_samples 
\ No newline at end of file
+            yield sample
\ No newline at end of file
@@ -5,7 +5,14 @@ ISIC2020 Dataset Processor
 import pandas as pd
 from pathlib import Path
 from typing import Dict, List, Any
-from base_processor import BaseProcessor
+try:
+    from .base_processor import BaseProcessor, QUESTION_TEXT
+except ImportError:  # run as a script from this directory
+    from base_processor import BaseProcessor, QUESTION_TEXT
+
+
+# Low-cardinality columns of the metadata file
+CATEGORICAL_COLUMNS = ('sex', 'anatom_site_general_challenge', 'diagnosis', 'benign_malignant')
 
 
 class ISIC2020Processor(BaseProcessor):
@@ -23,50 +30,62 @@ class ISIC2020Processor(BaseProcessor):
             raise FileNotFoundError(f"Metadata file not found: {metadata_file}")
         
         # Read the metadata file
-        df = self.read_csv_safely(metadata_file)
+        # Label columns repeat a handful of values, so read them as categoricals
+        df = self.read_csv_safely(metadata_file, dtype=dict.fromkeys(CATEGORICAL_COLUMNS, 'category'))
+        
+        if df.empty:
+            return []
+        
+        # Pull every column out once instead of boxing a Series per row
+        image_names = df['image_name'].tolist()
+        patient_ids = df['patient_id'].tolist()
+        benign_malignant = df['benign_malignant'].tolist()
+        has_benign_malignant = df['benign_malignant'].notna().tolist()
+        targets = df['target'].tolist()
+        has_target = df['target'].notna().tolist()
+        
+        diagnoses = self.standardize_diagnosis_series(df['diagnosis']).tolist()
+        ages = self.standardize_age_series(df['age_approx']).tolist()
+        sexes = self.standardize_sex_series(df['sex']).tolist()
+        sites = self.standardize_anatomical_site_series(df['anatom_site_general_challenge']).tolist()
+        question_lists = self.generate_vqa_questions_batch(diagnoses, ages, sexes, sites)
         
         processed_samples = []
         
-        for _, row in df.iterrows():
-            # Create image path
-            image_path = f"images/{row['image_name']}.jpg"
-            
-            # Extract additional metadata
-            additional_metadata = {
-                'patient_id': row['patient_id'],
-                'benign_malignant': row['benign_malignant'],
-                'target': row['target']
+        for i, image_name in enumerate(image_names):
+            sample = {
+                'dataset_name': self.dataset_name,
+                'sample_id': image_name,
+                'image_path': f"images/{image_name}.jpg",
+                'diagnosis': diagnoses[i],
+                'age': ages[i],
+                'sex': sexes[i],
+                'anatomical_site': sites[i],
+                'metadata': {
+                    'patient_id': patient_ids[i],
+                    'benign_malignant': benign_malignant[i],
+                    'target': targets[i]
+                }
             }
             
-            # Create standardized sample
-            sample = self.create_standardized_sample(
-                sample_id=row['image_name'],
-                image_path=image_path,
-                diagnosis=row['diagnosis'],
-                age=row['age_approx'],
-                sex=row['sex'],
-                anatomical_site=row['anatom_site_general_challenge'],
-                additional_metadata=additional_metadata
-            )
-            
             # Add VQA questions
-            sample['vqa_questions'] = self.generate_vqa_questions(sample)
+            questions = question_lists[i]
             
             # Add benign/malignant questions
-            if pd.notna(row['benign_malignant']):
-                sample['vqa_questions'].append({
-                    'question': 'Is this lesion benign or malignant?',
-                    'answer': row['benign_malignant']
+            if has_benign_malignant[i]:
+                questions.append({
+                    'question': QUESTION_TEXT['benign_malignant'],
+                    'answer': benign_malignant[i]
                 })
             
             # Add target-specific questions (for competition)
-            if pd.notna(row['target']):
-                target_answer = 'Yes' if row['target'] == 1 else 'No'
-                sample['vqa_questions'].append({
+            if has_target[i]:
+                questions.append({
                     'question': 'Is this lesion the target class for the competition?',
-                    'answer': target_answer
+                    'answer': 'Yes' if targets[i] == 1 else 'No'
                 })
             
+            sample['vqa_questions'] = questions
             processed_samples.append(sample)
         
-        return processed_samples 
\ No newline at end of file
+        return processed_samples
\ No newline at end of file
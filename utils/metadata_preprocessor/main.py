@@ -7,57 +7,190 @@ for Visual Question Answering (VQA) dataset creation.
 import os
 import sys
 import json
+import math
 import argparse
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
 # Add the current directory to sys.path to import processors
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from bcn20k_processor import BCN20KProcessor
-from ddi_processor import DDIProcessor
-from ddi2_processor import DDI2Processor
-from derm12345_processor import Derm12345Processor
-from ham10k_processor import HAM10KProcessor
-from hiba_processor import HIBAProcessor
-from isic2020_processor import ISIC2020Processor
-from mra_midas_processor import MRAMIDASProcessor
-from mskcc_processor import MSKCCProcessor
-from pad_ufes20_processor import PADUfes20Processor
-from patch16_processor import Patch16Processor
-from scin_processor import SCINProcessor
+
+try:
+    import orjson  # optional, several times faster than the json module
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    from .processor_registry import DATASET_PROCESSORS
+except ImportError:  # run as a script from this directory
+    from processor_registry import DATASET_PROCESSORS
+
+# File suffix written for each output format
+OUTPUT_SUFFIXES = {'json': '.json', 'jsonl': '.jsonl'}
+
+# Buffer size for output files, large enough that big outputs are written in few system calls
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Compact C-accelerated encoding that raises ValueError on NaN and infinity
+_encode_finite = json.JSONEncoder(allow_nan=False).encode
+
+
+@contextmanager
+def atomic_open(path, mode='w'):
+    """Write to a temporary file next to path, moved over path only once the block completes.
+    
+    A failed write leaves any earlier output in place instead of a truncated file.
+    """
+    tmp_path = path.with_name(path.name + '.tmp')
+    # Text is written as UTF-8 whatever the locale, since compact output keeps non-ASCII characters
+    encoding = None if 'b' in mode else 'utf-8'
+    try:
+        with open(tmp_path, mode, buffering=WRITE_BUFFER_SIZE, encoding=encoding) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def write_json_array(samples, f, indent=True) -> int:
+    """Write samples as a JSON array one at a time; return how many were written.
+    
+    The array is indented as json.dump(indent=2) writes it or, without indent,
+    compact with one sample per line.
+    """
+    if not indent:
+        return _write_compact_json_array(samples, f)
+    n_samples = 0
+    for sample in samples:
+        f.write(',\n  ' if n_samples else '[\n  ')
+        # JSON escapes newlines inside strings, so re-indenting on '\n' is safe
+        f.write(_dumps_indented(sample).replace('\n', '\n  '))
+        n_samples += 1
+    f.write('\n]' if n_samples else '[]')
+    return n_samples
+
+
+def _write_compact_json_array(samples, f) -> int:
+    """Write samples as a compact JSON array with one sample per line; return how many were written."""
+    n_samples = 0
+    for sample in samples:
+        f.write(',\n' if n_samples else '[')
+        # The json fallback writes the same text as orjson: NaN as null, non-ASCII unescaped
+        f.write(orjson.dumps(sample).decode() if HAS_ORJSON
+                else json.dumps(_non_finite_to_none(sample), separators=(',', ':'), ensure_ascii=False))
+        n_samples += 1
+    f.write(']' if n_samples else '[]')
+    return n_samples
+
+
+def _non_finite_to_none(value):
+    """Copy value with NaN and infinite floats replaced by None, as orjson serializes them."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _non_finite_to_none(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_non_finite_to_none(item) for item in value]
+    return value
+
+
+def _dumps_indented(sample) -> str:
+    """Serialize a sample as json.dumps(sample, indent=2) does, through orjson where that gives the same text.
+    
+    orjson writes NaN as null and non-ASCII characters unescaped, so samples
+    with either are left to the json module.
+    """
+    if HAS_ORJSON:
+        try:
+            data = orjson.dumps(sample, option=orjson.OPT_INDENT_2)
+            # A null may be a NaN; the compact C encoder rejects those quickly
+            if data.isascii() and (b'null' not in data or _encode_finite(sample)):
+                return data.decode()
+        except (orjson.JSONEncodeError, ValueError):
+            pass
+    return json.dumps(sample, indent=2)
+
+
+def write_jsonl(samples, f) -> int:
+    """Write samples to a binary file as JSON Lines, one compact object per line; return how many were written."""
+    n_samples = 0
+    for sample in samples:
+        # The json fallback writes the same bytes as orjson: compact, NaN as null, non-ASCII as UTF-8
+        f.write(orjson.dumps(sample) if HAS_ORJSON
+                else json.dumps(_non_finite_to_none(sample), separators=(',', ':'), ensure_ascii=False).encode())
+        f.write(b'\n')
+        n_samples += 1
+    return n_samples
+
+
+def read_samples(path):
+    """Load the samples of a processed file written as a JSON array or as JSON Lines."""
+    with open(path, 'rb') as f:
+        return parse_samples(f.read(), jsonl=path.suffix == '.jsonl')
+
+
+def parse_samples(data, jsonl=False):
+    """Parse the contents of a processed file, a JSON array or, with jsonl, JSON Lines."""
+    if jsonl:
+        return [_loads(line) for line in data.split(b'\n') if line.strip()]
+    return _loads(data)
+
+
+def _loads(data):
+    """Parse JSON with orjson when it is installed, and with json when it holds the NaN literals orjson rejects."""
+    # Processed files write missing values as NaN, so check for those first rather than
+    # parsing twice; the try still covers the rarer Infinity
+    if HAS_ORJSON and b'NaN' not in data:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
 
 
 class MetadataPreprocessor:
     """Main class for preprocessing metadata from various dermatology datasets."""
     
-    def __init__(self, datasets_dir="../datasets", output_dir="./processed_metadata"):
+    def __init__(self, datasets_dir="../datasets", output_dir="./processed_metadata", output_format="json"):
+        if output_format not in OUTPUT_SUFFIXES:
+            raise ValueError(f"Unknown output format: {output_format}")
+        
         self.datasets_dir = Path(datasets_dir)
         self.output_dir = Path(output_dir)
+        self.output_format = output_format
         self.output_dir.mkdir(exist_ok=True)
         
-        # Initialize all processors
-        self.processors = {
-            'bcn20k': BCN20KProcessor(),
-            'ddi': DDIProcessor(),
-            'ddi-2': DDI2Processor(),
-            'derm12345': Derm12345Processor(),
-            'ham10k': HAM10KProcessor(),
-            'hiba': HIBAProcessor(),
-            'isic2020': ISIC2020Processor(),
-            'mra-midas': MRAMIDASProcessor(),
-            'mskcc': MSKCCProcessor(),
-            'pad-ufes20': PADUfes20Processor(),
-            'patch16': Patch16Processor(),
-            'scin': SCINProcessor()
-        }
+        # Processors are created on first use by get_processor
+        self.processors = {}
+    
+    def get_processor(self, dataset_name):
+        """Return the processor for a dataset, importing its module on first use."""
+        processor = self.processors.get(dataset_name)
+        if processor is None:
+            module_name, class_name = DATASET_PROCESSORS[dataset_name]
+            # Relative to the package when main is imported from it, as a top-level module when run as a script
+            module = importlib.import_module('.' + module_name, __package__) if __package__ else importlib.import_module(module_name)
+            processor_class = getattr(module, class_name)
+            processor = self.processors[dataset_name] = processor_class()
+        return processor
+    
+    def output_file(self, dataset_name):
+        """Path of the processed file for a dataset in the configured output format."""
+        return self.output_dir / f"{dataset_name}_processed{OUTPUT_SUFFIXES[self.output_format]}"
     
     def process_dataset(self, dataset_name):
         """Process a single dataset."""
-        if dataset_name not in self.processors:
+        if dataset_name not in DATASET_PROCESSORS:
             print(f"Unknown dataset: {dataset_name}")
             return False
         
-        processor = self.processors[dataset_name]
+        processor = self.get_processor(dataset_name)
         dataset_path = self.datasets_dir / dataset_name
         
         if not dataset_path.exists():
@@ -66,14 +199,17 @@ class MetadataPreprocessor:
         
         try:
             print(f"Processing {dataset_name}...")
-            processed_data = processor.process(dataset_path)
             
-            # Save processed data
-            output_file = self.output_dir / f"{dataset_name}_processed.json"
-            with open(output_file, 'w') as f:
-                json.dump(processed_data, f, indent=2)
+            # Stream samples straight to disk instead of holding them all in memory
+            output_file = self.output_file(dataset_name)
+            if self.output_format == 'jsonl':
+                with atomic_open(output_file, 'wb') as f:
+                    n_samples = write_jsonl(processor.iter_samples(dataset_path), f)
+            else:
+                with atomic_open(output_file, 'w') as f:
+                    n_samples = write_json_array(processor.iter_samples(dataset_path), f)
             
-            print(f"Processed {len(processed_data)} samples from {dataset_name}")
+            print(f"Processed {n_samples} samples from {dataset_name}")
             print(f"Output saved to: {output_file}")
             return True
             
@@ -81,12 +217,26 @@ class MetadataPreprocessor:
             print(f"Error processing {dataset_name}: {str(e)}")
             return False
     
-    def process_all_datasets(self):
-        """Process all available datasets."""
-        results = {}
+    def process_all_datasets(self, max_workers=None):
+        """Process all available datasets, each in its own worker process.
+        
+        By default one worker runs per dataset, up to the CPU count.
+        """
+        dataset_names = list(DATASET_PROCESSORS)
+        if max_workers is None:
+            max_workers = min(len(dataset_names), os.cpu_count() or 1)
         
-        for dataset_name in self.processors.keys():
-            results[dataset_name] = self.process_dataset(dataset_name)
+        # Forked workers inherit pandas and the processors imported here, where spawned
+        # ones would import them again; elsewhere fork is unsafe, so keep the default
+        mp_context = None
+        if sys.platform.startswith('linux'):
+            mp_context = multiprocessing.get_context('fork')
+            for dataset_name in dataset_names:
+                self.get_processor(dataset_name)
+        
+        # Datasets are independent and each writes its own output file
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+            results = dict(zip(dataset_names, executor.map(self.process_dataset, dataset_names)))
         
         # Generate summary
         successful = [name for name, success in results.items() if success]
@@ -104,21 +254,37 @@ class MetadataPreprocessor:
         return results
     
     def combine_all_datasets(self):
-        """Combine all processed datasets into a single JSON file."""
-        combined_data = []
+        """Combine all processed datasets into a single file in the configured output format."""
+        output_files = [self.output_file(dataset_name) for dataset_name in DATASET_PROCESSORS]
+        output_files = [output_file for output_file in output_files if output_file.exists()]
+        combined_file = self.output_dir / f"combined_metadata{OUTPUT_SUFFIXES[self.output_format]}"
         
-        for dataset_name in self.processors.keys():
-            output_file = self.output_dir / f"{dataset_name}_processed.json"
+        # Read the files on a few threads so later reads overlap the parsing of earlier ones
+        combined_data = []
+        with ThreadPoolExecutor(max_workers=min(4, len(output_files)) or 1) as executor:
+            contents = executor.map(Path.read_bytes, output_files)
             
-            if output_file.exists():
-                with open(output_file, 'r') as f:
-                    data = json.load(f)
-                    combined_data.extend(data)
-        
-        # Save combined data
-        combined_file = self.output_dir / "combined_metadata.json"
-        with open(combined_file, 'w') as f:
-            json.dump(combined_data, f, indent=2)
+            if self.output_format == 'jsonl':
+                # JSON Lines files combine by concatenation, without re-serializing the samples
+                with atomic_open(combined_file, 'wb') as f:
+                    for data in contents:
+                        combined_data.extend(parse_samples(data, jsonl=True))
+                        f.write(data)
+                        if data and not data.endswith(b'\n'):
+                            f.write(b'\n')
+            else:
+                # Splice the arrays' element text together instead of re-serializing the samples;
+                # for files from write_json_array this is the same text json.dump(indent=2) writes
+                with atomic_open(combined_file, 'wb') as f:
+                    f.write(b'[')
+                    n_spliced = 0
+                    for data in contents:
+                        combined_data.extend(parse_samples(data))
+                        elements = data.strip()[1:-1].rstrip()
+                        if elements:
+                            f.write(b',' + elements if n_spliced else elements)
+                            n_spliced += 1
+                    f.write(b'\n]' if n_spliced else b']')
         
         print(f"Combined {len(combined_data)} samples from all datasets")
         print(f"Combined output saved to: {combined_file}")
@@ -135,17 +301,21 @@ def main():
                        help='Directory to save processed metadata')
     parser.add_argument('--combine', action='store_true', 
                        help='Combine all processed datasets into a single file')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Number of datasets to process in parallel (default: CPU count)')
+    parser.add_argument('--format', type=str, choices=sorted(OUTPUT_SUFFIXES), default='json',
+                       help='Write processed files as a JSON array (json) or as JSON Lines (jsonl)')
     
     args = parser.parse_args()
     
-    preprocessor = MetadataPreprocessor(args.datasets_dir, args.output_dir)
+    preprocessor = MetadataPreprocessor(args.datasets_dir, args.output_dir, args.format)
     
     if args.dataset:
         # Process specific dataset
         preprocessor.process_dataset(args.dataset)
     else:
         # Process all datasets
-        preprocessor.process_all_datasets()
+        preprocessor.process_all_datasets(max_workers=args.workers)
     
     if args.combine:
         # Combine all datasets
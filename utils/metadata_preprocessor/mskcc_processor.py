@@ -5,7 +5,10 @@ MSKCC Dataset Processor
 import pandas as pd
 from pathlib import Path
 from typing import Dict, List, Any
-from base_processor import BaseProcessor
+try:
+    from .base_processor import BaseProcessor
+except ImportError:  # run as a script from this directory
+    from base_processor import BaseProcessor
 
 
 class MSKCCProcessor(BaseProcessor):
@@ -27,17 +30,23 @@ class MSKCCProcessor(BaseProcessor):
         
         processed_samples = []
         
-        for _, row in df.iterrows():
+        # Bind the per-row calls once so the loop skips the attribute lookups
+        create_sample = self.create_standardized_sample
+        generate_questions = self.generate_vqa_questions
+        append_sample = processed_samples.append
+        
+        # Convert the table to plain dicts in one pass instead of building a Series per row
+        for row in df.to_dict('records'):
             # Create image path
             image_path = f"images/{row.get('image_id', row.get('filename', 'unknown'))}"
             
             # Extract additional metadata
             additional_metadata = {
-                'original_data': dict(row)
+                'original_data': row
             }
             
             # Create standardized sample
-            sample = self.create_standardized_sample(
+            sample = create_sample(
                 sample_id=str(row.get('id', len(processed_samples))),
                 image_path=image_path,
                 diagnosis=row.get('diagnosis', 'unknown'),
@@ -48,8 +57,8 @@ class MSKCCProcessor(BaseProcessor):
             )
             
             # Add VQA questions
-            sample['vqa_questions'] = self.generate_vqa_questions(sample)
+            sample['vqa_questions'] = generate_questions(sample)
             
-            processed_samples.append(sample)
+            append_sample(sample)
         
         return processed_samples 
\ No newline at end of file
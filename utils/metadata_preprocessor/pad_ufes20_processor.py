@@ -5,7 +5,17 @@ PAD-UFES20 Dataset Processor
 import pandas as pd
 from pathlib import Path
 from typing import Dict, List, Any
-from base_processor import BaseProcessor
+try:
+    from .base_processor import BaseProcessor, QUESTION_TEXT
+except ImportError:  # run as a script from this directory
+    from base_processor import BaseProcessor, QUESTION_TEXT
+
+
+# Question asked for each symptom column, in output order
+SYMPTOM_QUESTIONS = {
+    symptom: f'Does the lesion {symptom}?'
+    for symptom in ('itch', 'grew', 'hurt', 'changed', 'bleed')
+}
 
 
 class PADUfes20Processor(BaseProcessor):
@@ -27,7 +37,8 @@ class PADUfes20Processor(BaseProcessor):
         
         processed_samples = []
         
-        for _, row in df.iterrows():
+        # Convert the table to plain dicts in one pass instead of building a Series per row
+        for row in df.to_dict('records'):
             # Create image path
             image_path = f"images/{row['img_id']}"
             
@@ -71,39 +82,44 @@ class PADUfes20Processor(BaseProcessor):
             # Add VQA questions
             sample['vqa_questions'] = self.generate_vqa_questions(sample)
             
-            # Add PAD-UFES20 specific questions
-            if pd.notna(row.get('smoke')):
-                sample['vqa_questions'].append({
+            # Add PAD-UFES20 specific questions, reading each answer column once
+            questions = sample['vqa_questions']
+            
+            smoke = row.get('smoke')
+            if pd.notna(smoke):
+                questions.append({
                     'question': 'Does the patient smoke?',
-                    'answer': 'Yes' if row['smoke'] else 'No'
+                    'answer': 'Yes' if smoke else 'No'
                 })
             
-            if pd.notna(row.get('drink')):
-                sample['vqa_questions'].append({
+            drink = row.get('drink')
+            if pd.notna(drink):
+                questions.append({
                     'question': 'Does the patient drink alcohol?',
-                    'answer': 'Yes' if row['drink'] else 'No'
+                    'answer': 'Yes' if drink else 'No'
                 })
             
-            if pd.notna(row.get('skin_cancer_history')):
-                sample['vqa_questions'].append({
+            skin_cancer_history = row.get('skin_cancer_history')
+            if pd.notna(skin_cancer_history):
+                questions.append({
                     'question': 'Does the patient have a history of skin cancer?',
-                    'answer': 'Yes' if row['skin_cancer_history'] else 'No'
+                    'answer': 'Yes' if skin_cancer_history else 'No'
                 })
             
-            if pd.notna(row.get('fitspatrick')):
-                sample['vqa_questions'].append({
-                    'question': 'What is the Fitzpatrick skin type?',
-                    'answer': f"Fitzpatrick type {row['fitspatrick']}"
+            fitzpatrick = row.get('fitspatrick')
+            if pd.notna(fitzpatrick):
+                questions.append({
+                    'question': QUESTION_TEXT['fitzpatrick'],
+                    'answer': f"Fitzpatrick type {fitzpatrick}"
                 })
             
             # Add symptom-related questions
-            symptoms = ['itch', 'grew', 'hurt', 'changed', 'bleed']
-            for symptom in symptoms:
-                if pd.notna(row.get(symptom)):
-                    answer = 'Yes' if row[symptom] else 'No'
-                    sample['vqa_questions'].append({
-                        'question': f'Does the lesion {symptom}?',
-                        'answer': answer
+            for symptom, question in SYMPTOM_QUESTIONS.items():
+                value = row.get(symptom)
+                if pd.notna(value):
+                    questions.append({
+                        'question': question,
+                        'answer': 'Yes' if value else 'No'
                     })
             
             processed_samples.append(sample)
@@ -6,7 +6,10 @@ import pandas as pd
 import json
 from pathlib import Path
 from typing import Dict, List, Any
-from base_processor import BaseProcessor
+try:
+    from .base_processor import BaseProcessor
+except ImportError:  # run as a script from this directory
+    from base_processor import BaseProcessor
 
 
 class Patch16Processor(BaseProcessor):
@@ -34,26 +37,35 @@ class Patch16Processor(BaseProcessor):
         with open(class_dict_file, 'r') as f:
             class_dict = json.load(f)
         
+        # Map class number to diagnosis once per distinct class rather than once per row
+        diagnoses = self._standardize_series(
+            self._column(df, 'class', default=0),
+            lambda class_num: class_dict.get(str(class_num), 'unknown')).tolist()
+        
         processed_samples = []
         
-        for _, row in df.iterrows():
+        # Bind the per-row calls once so the loop skips the attribute lookups
+        create_sample = self.create_standardized_sample
+        generate_questions = self.generate_vqa_questions
+        append_sample = processed_samples.append
+        
+        # Convert the table to plain dicts in one pass instead of building a Series per row
+        for row, diagnosis in zip(df.to_dict('records'), diagnoses):
             # Create image path
             image_path = f"images/{row.get('tile_id', row.get('filename', 'unknown'))}"
             
-            # Map class number to diagnosis
+            # Class label as given in the tiles file
             class_num = row.get('class', 0)
-            diagnosis = class_dict.get(str(class_num), 'unknown')
             
             # Extract additional metadata
             additional_metadata = {
                 'tile_id': row.get('tile_id'),
                 'class_num': class_num,
-                'class_dict': class_dict,
-                'original_data': dict(row)
+                'original_data': row
             }
             
             # Create standardized sample
-            sample = self.create_standardized_sample(
+            sample = create_sample(
                 sample_id=str(row.get('tile_id', len(processed_samples))),
                 image_path=image_path,
                 diagnosis=diagnosis,
@@ -64,7 +76,7 @@ class Patch16Processor(BaseProcessor):
             )
             
             # Add VQA questions
-            sample['vqa_questions'] = self.generate_vqa_questions(sample)
+            sample['vqa_questions'] = generate_questions(sample)
             
             # Add Patch16-specific questions
             sample['vqa_questions'].append({
@@ -72,6 +84,6 @@ class Patch16Processor(BaseProcessor):
                 'answer': str(class_num)
             })
             
-            processed_samples.append(sample)
+            append_sample(sample)
         
         return processed_samples 
\ No newline at end of file
@@ -0,0 +1,20 @@
+"""
+Processor module and class for each dataset directory name.
+"""
+
+# Kept apart from the package __init__ so main.py can import it when run as a script;
+# a processor's module (and pandas with it) is only imported when that dataset is processed
+DATASET_PROCESSORS = {
+    'bcn20k': ('bcn20k_processor', 'BCN20KProcessor'),
+    'ddi': ('ddi_processor', 'DDIProcessor'),
+    'ddi-2': ('ddi2_processor', 'DDI2Processor'),
+    'derm12345': ('derm12345_processor', 'Derm12345Processor'),
+    'ham10k': ('ham10k_processor', 'HAM10KProcessor'),
+    'hiba': ('hiba_processor', 'HIBAProcessor'),
+    'isic2020': ('isic2020_processor', 'ISIC2020Processor'),
+    'mra-midas': ('mra_midas_processor', 'MRAMIDASProcessor'),
+    'mskcc': ('mskcc_processor', 'MSKCCProcessor'),
+    'pad-ufes20': ('pad_ufes20_processor', 'PADUfes20Processor'),
+    'patch16': ('patch16_processor', 'Patch16Processor'),
+    'scin': ('scin_processor', 'SCINProcessor')
+} 
\ No newline at end of file
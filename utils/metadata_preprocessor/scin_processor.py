@@ -2,10 +2,41 @@
 SCIN Dataset Processor
 """
 
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Any
-from base_processor import BaseProcessor
+try:
+    from .base_processor import BaseProcessor, QUESTION_TEXT
+except ImportError:  # run as a script from this directory
+    from base_processor import BaseProcessor, QUESTION_TEXT
+
+
+# Prefixes of the YES/NO columns for body parts, symptoms and other symptoms
+FLAG_PREFIXES = ('body_parts_', 'condition_symptoms_', 'other_symptoms_')
+
+# Other columns read from the cases file
+CASE_COLUMNS = frozenset({
+    'case_id',
+    'source',
+    'year',
+    'age_group',
+    'sex_at_birth',
+    'fitzpatrick_skin_type',
+    'combined_race',
+    'related_category',
+    'condition_duration',
+    'image_1_path',
+    'image_2_path',
+    'image_3_path',
+    'image_1_shot_type',
+    'image_2_shot_type',
+    'image_3_shot_type'
+})
+
+# Columns read from the labels file; the merge on case_id keeps only labelled cases
+LABEL_COLUMNS = frozenset({'case_id', 'label_name', 'label_category'})
 
 
 class SCINProcessor(BaseProcessor):
@@ -26,16 +57,29 @@ class SCINProcessor(BaseProcessor):
         if not labels_file.exists():
             raise FileNotFoundError(f"Labels file not found: {labels_file}")
         
-        # Read the metadata files
-        cases_df = self.read_csv_safely(cases_file)
-        labels_df = self.read_csv_safely(labels_file)
+        # Read the metadata files, the labels on a second thread while the cases parse;
+        # columns the samples never use are skipped by the parser
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            labels_future = executor.submit(self.read_csv_safely, labels_file,
+                                            usecols=lambda column: column in LABEL_COLUMNS)
+            cases_df = self.read_csv_safely(
+                cases_file, usecols=lambda column: column in CASE_COLUMNS or column.startswith(FLAG_PREFIXES))
+            labels_df = labels_future.result()
         
         # Merge cases with labels
         merged_df = cases_df.merge(labels_df, on='case_id', how='inner')
         
+        # Decode the YES/NO flag columns for all rows at once
+        body_parts_per_row, symptoms_per_row, other_symptoms_per_row = (
+            self.flagged_names(merged_df, prefix) for prefix in FLAG_PREFIXES)
+        
+        # Convert the other columns to plain dicts in one pass instead of building a Series per row
+        flag_columns = [col for col in merged_df.columns if col.startswith(FLAG_PREFIXES)]
+        rows = merged_df.drop(columns=flag_columns).to_dict('records')
+        
         processed_samples = []
         
-        for _, row in merged_df.iterrows():
+        for i, row in enumerate(rows):
             # Create image path (use the first image if multiple)
             image_path = row.get('image_1_path', '')
             
@@ -43,26 +87,10 @@ class SCINProcessor(BaseProcessor):
             age_group = row.get('age_group', '')
             sex = row.get('sex_at_birth', '')
             
-            # Extract body parts
-            body_parts = []
-            body_part_columns = [col for col in row.index if col.startswith('body_parts_')]
-            for col in body_part_columns:
-                if row[col] == 'YES':
-                    body_parts.append(col.replace('body_parts_', ''))
-            
-            # Extract symptoms
-            symptoms = []
-            symptom_columns = [col for col in row.index if col.startswith('condition_symptoms_')]
-            for col in symptom_columns:
-                if row[col] == 'YES':
-                    symptoms.append(col.replace('condition_symptoms_', ''))
-            
-            # Extract other symptoms
-            other_symptoms = []
-            other_symptom_columns = [col for col in row.index if col.startswith('other_symptoms_')]
-            for col in other_symptom_columns:
-                if row[col] == 'YES':
-                    other_symptoms.append(col.replace('other_symptoms_', ''))
+            # Body parts and symptoms marked YES
+            body_parts = body_parts_per_row[i]
+            symptoms = symptoms_per_row[i]
+            other_symptoms = other_symptoms_per_row[i]
             
             # Extract additional metadata
             additional_metadata = {
@@ -131,7 +159,7 @@ class SCINProcessor(BaseProcessor):
             
             if row.get('fitzpatrick_skin_type'):
                 sample['vqa_questions'].append({
-                    'question': 'What is the Fitzpatrick skin type?',
+                    'question': QUESTION_TEXT['fitzpatrick'],
                     'answer': f"Fitzpatrick type {row['fitzpatrick_skin_type']}"
                 })
             
@@ -139,6 +167,13 @@ class SCINProcessor(BaseProcessor):
         
         return processed_samples
     
+    def flagged_names(self, df: pd.DataFrame, prefix: str) -> List[List[str]]:
+        """For each row, the names (without prefix) of the prefix columns set to 'YES'."""
+        columns = [col for col in df.columns if col.startswith(prefix)]
+        names = np.array([col.replace(prefix, '') for col in columns], dtype=object)
+        flags = df[columns].to_numpy() == 'YES'
+        return [names[row_flags].tolist() for row_flags in flags]
+    
     def parse_age_group(self, age_group: str) -> float:
         """Parse age group string to approximate age."""
         if not age_group or pd.isna(age_group):
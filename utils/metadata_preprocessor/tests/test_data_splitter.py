@@ -0,0 +1,44 @@
+"""
+Tests for the frame layout used by DataSplitter.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_splitter import DataSplitter, frame_to_records, records_to_frame
+
+
+# Samples missing keys that others have, and one with an explicit None
+SAMPLES = [
+    {'sample_id': 'a', 'diagnosis': 'mel'},
+    {'sample_id': 'b'},
+    {'sample_id': 'c', 'diagnosis': 'unknown', 'extra': 1},
+    {'sample_id': 'd', 'diagnosis': None, 'vqa_questions': [{'question': 'q', 'answer': 'a'}]}
+]
+
+
+class TestMissingKeys(unittest.TestCase):
+    """Samples with missing keys give the same results as a frame and as a list."""
+    
+    def test_round_trip_keeps_each_sample_keys(self):
+        self.assertEqual(frame_to_records(records_to_frame(SAMPLES)), SAMPLES)
+    
+    def test_statistics_match_list(self):
+        splitter = DataSplitter()
+        frame_stats = splitter._get_split_statistics(records_to_frame(SAMPLES))
+        self.assertEqual(frame_stats, splitter._get_split_statistics(SAMPLES))
+        self.assertEqual(frame_stats['diagnosis_distribution'], {'mel': 1, 'unknown': 2, None: 1})
+    
+    def test_splits_match_list(self):
+        samples = SAMPLES * 5
+        for method in ('stratified_split', 'random_split', 'dataset_aware_split'):
+            frame_splits = getattr(DataSplitter(7), method)(records_to_frame(samples))
+            list_splits = getattr(DataSplitter(7), method)(samples)
+            self.assertEqual([frame_to_records(split) for split in frame_splits], list(list_splits), method)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -4,16 +4,40 @@ VQA Question Enricher for Dermatology Dataset
 Generates additional diverse and clinically relevant questions for VQA training.
 """
 
+import io
+import os
 import json
-import random
+import bisect
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional, Sequence, Tuple
+try:
+    from .main import atomic_open, read_samples, write_json_array
+except ImportError:  # run as a script from this directory
+    from main import atomic_open, read_samples, write_json_array
+
+
+# Datasets are only split across worker processes when each worker gets at least this many
+# samples; smaller ones are enriched faster than the workers start
+MIN_SAMPLES_PER_WORKER = 2000
+
+# Text around the samples of an indented and of a compact JSON array from write_json_array
+ARRAY_BRACKETS = {True: ('[\n', '\n]'), False: ('[', ']')}
+
+# Ages at which the age-band answers change: pediatric, young adult, middle-aged, elderly
+AGE_BAND_BOUNDARIES = (18, 40, 65)
+
+# Age questions whose answer depends only on the age band
+AGE_BAND_KEYWORDS = ('age group', 'elderly', 'pediatric')
 
 
 class VQAEnricher:
     """Enriches VQA datasets with additional diverse questions."""
     
-    def __init__(self):
+    def __init__(self, random_seed: Optional[int] = None):
+        self.rng = np.random.default_rng(random_seed)
+        
         self.diagnosis_templates = {
             'melanoma': [
                 "Is this lesion malignant?",
@@ -168,55 +192,105 @@ class VQAEnricher:
             "What features suggest malignancy?",
             "How does this compare to actinic keratosis?"
         ]
-    
-    def generate_diagnosis_questions(self, sample: Dict[str, Any]) -> List[Dict[str, str]]:
-        """Generate diagnosis-specific questions."""
-        questions = []
-        diagnosis = sample.get('diagnosis', '').lower()
         
-        if diagnosis in self.diagnosis_templates:
-            templates = self.diagnosis_templates[diagnosis]
-            
-            # Add specific answers based on diagnosis
-            answers = self._get_diagnosis_answers(diagnosis, sample)
-            
-            for i, template in enumerate(templates[:3]):  # Limit to 3 questions
-                if i < len(answers):
-                    questions.append({
-                        'question': template,
-                        'answer': answers[i],
-                        'type': 'diagnosis_specific'
-                    })
-        
-        return questions
+        # Lowercase form of every template, looked up when deduplicating instead of lowering each time;
+        # _lower adds the questions the processors wrote and the diagnoses as it meets them
+        all_templates = [
+            *(template for templates in self.diagnosis_templates.values() for template in templates),
+            *(template for templates in self.anatomical_questions.values() for template in templates),
+            *(template for templates in self.demographic_questions.values() for template in templates),
+            *self.clinical_questions,
+            *self.comparison_questions
+        ]
+        self._lowercase = {template: template.lower() for template in all_templates}
+        
+        # Clinical and comparison answers depend only on the question and the diagnosis,
+        # so each keyword ladder runs once per pair and later samples reuse its answer
+        self._clinical_answers = {}
+        self._comparison_answers = {}
+        
+        # The diagnosis and anatomical questions are fixed for each diagnosis and site, so build them once
+        self._diagnosis_qa = {diagnosis: self._build_diagnosis_questions(diagnosis)
+                              for diagnosis in self.diagnosis_templates}
+        self._anatomical_qa = {site: self._build_anatomical_questions(site) for site in self.anatomical_questions}
+        
+        # Answers of the age-band questions for an age in each band, looked up by the band's index
+        self._age_band_answers = {
+            template: tuple(self._age_answer(self._lower(template), age) for age in (0, *AGE_BAND_BOUNDARIES))
+            for template in self.demographic_questions['age']
+            if any(keyword in self._lower(template) for keyword in AGE_BAND_KEYWORDS)
+        }
+    
+    def _lower(self, text: str) -> str:
+        """Lowercase a question or diagnosis through the cache; datasets repeat a small set of both."""
+        lowered = self._lowercase.get(text)
+        if lowered is None:
+            lowered = self._lowercase[text] = text.lower()
+        return lowered
+    
+    def generate_diagnosis_questions(self, sample: Dict[str, Any],
+                                     diagnosis: Optional[str] = None) -> List[Dict[str, str]]:
+        """Generate diagnosis-specific questions; diagnosis is the sample's lowercased diagnosis when already known."""
+        if diagnosis is None:
+            diagnosis = self._lower(sample.get('diagnosis', ''))
+        
+        # Copies, so callers can edit the questions they get without touching the cached ones
+        return [dict(qa) for qa in self._diagnosis_qa.get(diagnosis, ())]
     
     def generate_anatomical_questions(self, sample: Dict[str, Any]) -> List[Dict[str, str]]:
         """Generate anatomical site-specific questions."""
-        questions = []
         site = sample.get('anatomical_site')
         
-        if site and site in self.anatomical_questions:
-            templates = self.anatomical_questions[site]
-            
-            for template in templates[:2]:  # Limit to 2 questions
-                answer = self._get_anatomical_answer(template, site, sample)
+        if not site:
+            return []
+        return [dict(qa) for qa in self._anatomical_qa.get(site, ())]
+    
+    def _build_diagnosis_questions(self, diagnosis: str) -> List[Dict[str, str]]:
+        """Build the diagnosis-specific questions, which depend on the diagnosis alone."""
+        questions = []
+        templates = self.diagnosis_templates[diagnosis]
+        
+        # Add specific answers based on diagnosis
+        answers = self._get_diagnosis_answers(diagnosis, {})
+        
+        for i, template in enumerate(templates[:3]):  # Limit to 3 questions
+            if i < len(answers):
                 questions.append({
                     'question': template,
-                    'answer': answer,
-                    'type': 'anatomical'
+                    'answer': answers[i],
+                    'type': 'diagnosis_specific'
                 })
         
         return questions
     
-    def generate_demographic_questions(self, sample: Dict[str, Any]) -> List[Dict[str, str]]:
-        """Generate demographic-based questions."""
+    def _build_anatomical_questions(self, site: str) -> List[Dict[str, str]]:
+        """Build the anatomical site-specific questions, which depend on the site alone."""
+        questions = []
+        templates = self.anatomical_questions[site]
+        
+        for template in templates[:2]:  # Limit to 2 questions
+            answer = self._get_anatomical_answer(template, site, {})
+            questions.append({
+                'question': template,
+                'answer': answer,
+                'type': 'anatomical'
+            })
+        
+        return questions
+    
+    def generate_demographic_questions(self, sample: Dict[str, Any],
+                                       picks: Optional[Sequence[int]] = None) -> List[Dict[str, str]]:
+        """Generate demographic-based questions, the age and sex templates at the picked indices when given."""
         questions = []
+        if picks is None:
+            picks = self.draw_demographic_picks(1)[0]
+        age_pick, sex_pick = picks
         
         # Age-based questions
         age = sample.get('age')
         if age is not None:
             age_templates = self.demographic_questions['age']
-            template = random.choice(age_templates[:2])
+            template = age_templates[age_pick]
             answer = self._get_age_answer(template, age)
             questions.append({
                 'question': template,
@@ -228,7 +302,7 @@ class VQAEnricher:
         sex = sample.get('sex')
         if sex and sex != 'unknown':
             sex_templates = self.demographic_questions['sex']
-            template = random.choice(sex_templates[:2])
+            template = sex_templates[sex_pick]
             answer = self._get_sex_answer(template, sex, sample.get('diagnosis'))
             questions.append({
                 'question': template,
@@ -238,16 +312,21 @@ class VQAEnricher:
         
         return questions
     
-    def generate_clinical_questions(self, sample: Dict[str, Any]) -> List[Dict[str, str]]:
-        """Generate general clinical questions."""
+    def generate_clinical_questions(self, sample: Dict[str, Any],
+                                    picks: Optional[Sequence[int]] = None,
+                                    diagnosis: Optional[str] = None) -> List[Dict[str, str]]:
+        """Generate general clinical questions, those at the picked indices when given."""
         questions = []
-        diagnosis = sample.get('diagnosis', '').lower()
+        if diagnosis is None:
+            diagnosis = self._lower(sample.get('diagnosis', ''))
         
         # Select relevant clinical questions based on diagnosis
-        relevant_questions = random.sample(self.clinical_questions, min(3, len(self.clinical_questions)))
+        if picks is None:
+            picks = self.rng.choice(len(self.clinical_questions), min(3, len(self.clinical_questions)), replace=False)
+        relevant_questions = [self.clinical_questions[i] for i in picks]
         
         for question in relevant_questions:
-            answer = self._get_clinical_answer(question, sample)
+            answer = self._lookup_clinical_answer(question, diagnosis)
             questions.append({
                 'question': question,
                 'answer': answer,
@@ -256,16 +335,21 @@ class VQAEnricher:
         
         return questions
     
-    def generate_comparison_questions(self, sample: Dict[str, Any]) -> List[Dict[str, str]]:
-        """Generate comparative questions."""
+    def generate_comparison_questions(self, sample: Dict[str, Any],
+                                      picks: Optional[Sequence[int]] = None,
+                                      diagnosis: Optional[str] = None) -> List[Dict[str, str]]:
+        """Generate comparative questions, those at the picked indices when given."""
         questions = []
-        diagnosis = sample.get('diagnosis', '').lower()
+        if diagnosis is None:
+            diagnosis = self._lower(sample.get('diagnosis', ''))
         
         # Select 1-2 comparison questions
-        relevant_questions = random.sample(self.comparison_questions, min(2, len(self.comparison_questions)))
+        if picks is None:
+            picks = self.rng.choice(len(self.comparison_questions), min(2, len(self.comparison_questions)), replace=False)
+        relevant_questions = [self.comparison_questions[i] for i in picks]
         
         for question in relevant_questions:
-            answer = self._get_comparison_answer(question, sample)
+            answer = self._lookup_comparison_answer(question, diagnosis)
             questions.append({
                 'question': question,
                 'answer': answer,
@@ -357,8 +441,16 @@ class VQAEnricher:
             return f"This affects the {site_names.get(site, site)}"
     
     def _get_age_answer(self, question: str, age: float) -> str:
-        """Get age-specific answers."""
-        if 'age group' in question.lower():
+        """Get age-specific answers, from the age-band table when the question has one."""
+        answers = self._age_band_answers.get(question)
+        # NaN ages fail every comparison, so they take the checks in _age_answer
+        if answers is not None and age == age:
+            return answers[bisect.bisect_right(AGE_BAND_BOUNDARIES, age)]
+        return self._age_answer(self._lower(question), age)
+    
+    def _age_answer(self, question: str, age: float) -> str:
+        """Age-specific answer for a lowercased question."""
+        if 'age group' in question:
             if age < 18:
                 return "This is a pediatric patient"
             elif age < 40:
@@ -367,9 +459,9 @@ class VQAEnricher:
                 return "This is a middle-aged adult"
             else:
                 return "This is an elderly patient"
-        elif 'elderly' in question.lower():
+        elif 'elderly' in question:
             return "Yes" if age >= 65 else "No"
-        elif 'pediatric' in question.lower():
+        elif 'pediatric' in question:
             return "Yes" if age < 18 else "No"
         else:
             return f"The patient is {age} years old"
@@ -389,9 +481,19 @@ class VQAEnricher:
     
     def _get_clinical_answer(self, question: str, sample: Dict[str, Any]) -> str:
         """Get clinical answers based on diagnosis and context."""
-        diagnosis = sample.get('diagnosis', '').lower()
-        
-        if 'biopsy' in question.lower():
+        return self._lookup_clinical_answer(question, self._lower(sample.get('diagnosis', '')))
+    
+    def _lookup_clinical_answer(self, question: str, diagnosis: str) -> str:
+        """Clinical answer for a lowercased diagnosis, worked out once per question and diagnosis."""
+        key = (question, diagnosis)
+        answer = self._clinical_answers.get(key)
+        if answer is None:
+            answer = self._clinical_answers[key] = self._clinical_answer(self._lower(question), diagnosis)
+        return answer
+    
+    def _clinical_answer(self, question: str, diagnosis: str) -> str:
+        """Clinical answer for a lowercased question and diagnosis."""
+        if 'biopsy' in question:
             if diagnosis in ['melanoma', 'basal_cell_carcinoma', 'squamous_cell_carcinoma']:
                 return "Yes, biopsy is recommended for definitive diagnosis"
             elif diagnosis == 'actinic_keratosis':
@@ -399,19 +501,19 @@ class VQAEnricher:
             else:
                 return "Biopsy is typically not needed for clearly benign lesions"
         
-        elif 'monitor' in question.lower():
+        elif 'monitor' in question:
             if diagnosis == 'nevus':
                 return "Yes, regular monitoring for changes is recommended"
             else:
                 return "Monitoring may be appropriate depending on the diagnosis"
         
-        elif 'dermatologist' in question.lower():
+        elif 'dermatologist' in question:
             if diagnosis in ['melanoma', 'basal_cell_carcinoma', 'squamous_cell_carcinoma']:
                 return "Yes, dermatologist referral is indicated"
             else:
                 return "Dermatologist consultation may be helpful"
         
-        elif 'concerned' in question.lower():
+        elif 'concerned' in question:
             if diagnosis in ['melanoma', 'basal_cell_carcinoma', 'squamous_cell_carcinoma']:
                 return "Yes, this diagnosis requires attention and treatment"
             elif diagnosis == 'nevus':
@@ -419,7 +521,7 @@ class VQAEnricher:
             else:
                 return "The level of concern depends on the specific diagnosis"
         
-        elif 'sun protection' in question.lower():
+        elif 'sun protection' in question:
             return "Yes, sun protection is important for preventing skin cancer"
         
         else:
@@ -428,9 +530,19 @@ class VQAEnricher:
     
     def _get_comparison_answer(self, question: str, sample: Dict[str, Any]) -> str:
         """Get comparative answers."""
-        diagnosis = sample.get('diagnosis', '').lower()
-        
-        if 'normal mole' in question.lower():
+        return self._lookup_comparison_answer(question, self._lower(sample.get('diagnosis', '')))
+    
+    def _lookup_comparison_answer(self, question: str, diagnosis: str) -> str:
+        """Comparative answer for a lowercased diagnosis, worked out once per question and diagnosis."""
+        key = (question, diagnosis)
+        answer = self._comparison_answers.get(key)
+        if answer is None:
+            answer = self._comparison_answers[key] = self._comparison_answer(self._lower(question), diagnosis)
+        return answer
+    
+    def _comparison_answer(self, question: str, diagnosis: str) -> str:
+        """Comparative answer for a lowercased question and diagnosis."""
+        if 'normal mole' in question:
             if diagnosis == 'melanoma':
                 return "Melanoma often shows asymmetry, irregular borders, color variation, and diameter >6mm (ABCD criteria)"
             elif diagnosis == 'nevus':
@@ -438,13 +550,13 @@ class VQAEnricher:
             else:
                 return "This differs from a typical mole in its clinical appearance"
         
-        elif 'melanoma' in question.lower():
+        elif 'melanoma' in question:
             if diagnosis == 'melanoma':
                 return "This lesion shows features consistent with melanoma"
             else:
                 return f"This {diagnosis} typically lacks the irregular features of melanoma"
         
-        elif 'concerning' in question.lower():
+        elif 'concerning' in question:
             if diagnosis in ['melanoma', 'basal_cell_carcinoma', 'squamous_cell_carcinoma']:
                 return "Features like asymmetry, irregular borders, and rapid growth make this concerning"
             else:
@@ -453,55 +565,92 @@ class VQAEnricher:
         else:
             return "This lesion has specific features that help distinguish it from other skin conditions"
     
-    def enrich_sample(self, sample: Dict[str, Any], max_new_questions: int = 10) -> Dict[str, Any]:
-        """Enrich a single sample with additional VQA questions."""
-        enriched_sample = sample.copy()
-        
+    def draw_picks(self, n_samples: int, n_questions: int, k: int) -> np.ndarray:
+        """Draw k distinct question indices below n_questions for each of n_samples samples, in random order.
+        
+        One column is drawn per step for all samples at once; each draw is shifted
+        past the indices its sample already took, so every ordered pick is equally likely.
+        """
+        k = min(k, n_questions)
+        picks = np.empty((n_samples, k), dtype=np.intp)
+        for j in range(k):
+            column = self.rng.integers(0, n_questions - j, size=n_samples)
+            for taken in np.sort(picks[:, :j], axis=1).T:
+                column += column >= taken
+            picks[:, j] = column
+        return picks
+    
+    def draw_demographic_picks(self, n_samples: int) -> np.ndarray:
+        """Draw the age and sex template index of each of n_samples samples, each among the first two templates."""
+        n_templates = [min(2, len(self.demographic_questions['age'])), min(2, len(self.demographic_questions['sex']))]
+        return self.rng.integers(0, n_templates, size=(n_samples, 2))
+    
+    def enrich_sample(self, sample: Dict[str, Any], max_new_questions: int = 10,
+                      clinical_picks: Optional[Sequence[int]] = None,
+                      comparison_picks: Optional[Sequence[int]] = None,
+                      in_place: bool = False,
+                      demographic_picks: Optional[Sequence[int]] = None) -> Dict[str, Any]:
+        """Enrich a single sample with additional VQA questions.
+        
+        clinical_picks and comparison_picks are template indices drawn by draw_picks, and
+        demographic_picks the pair drawn by draw_demographic_picks; when omitted they
+        are drawn from self.rng for this sample alone. With in_place
+        the sample itself is enriched and returned instead of a copy.
+        """
         # Get existing questions to avoid duplication
-        existing_questions = {qa['question'].lower() for qa in sample.get('vqa_questions', [])}
+        lower = self._lower
+        existing_questions = {lower(qa['question']) for qa in sample.get('vqa_questions', [])}
         
         # Generate new questions
         new_questions = []
+        diagnosis = self._lower(sample.get('diagnosis', ''))
         
         # Add diagnosis-specific questions
-        new_questions.extend(self.generate_diagnosis_questions(sample))
+        new_questions.extend(self.generate_diagnosis_questions(sample, diagnosis))
         
         # Add anatomical questions
         new_questions.extend(self.generate_anatomical_questions(sample))
         
         # Add demographic questions
-        new_questions.extend(self.generate_demographic_questions(sample))
+        new_questions.extend(self.generate_demographic_questions(sample, demographic_picks))
         
         # Add clinical questions
-        new_questions.extend(self.generate_clinical_questions(sample))
+        new_questions.extend(self.generate_clinical_questions(sample, clinical_picks, diagnosis))
         
         # Add comparison questions
-        new_questions.extend(self.generate_comparison_questions(sample))
+        new_questions.extend(self.generate_comparison_questions(sample, comparison_picks, diagnosis))
         
         # Filter out duplicates and limit number
         unique_new_questions = []
         for qa in new_questions:
-            if qa['question'].lower() not in existing_questions and len(unique_new_questions) < max_new_questions:
+            question = lower(qa['question'])
+            if question not in existing_questions and len(unique_new_questions) < max_new_questions:
                 unique_new_questions.append(qa)
-                existing_questions.add(qa['question'].lower())
-        
-        # Add new questions to existing ones
-        enriched_sample['vqa_questions'] = sample.get('vqa_questions', []) + unique_new_questions
+                existing_questions.add(question)
         
-        return enriched_sample
+        # Add new questions to existing ones, extending the sample's own list in place
+        if in_place:
+            sample.setdefault('vqa_questions', []).extend(unique_new_questions)
+            return sample
+        return {**sample, 'vqa_questions': sample.get('vqa_questions', []) + unique_new_questions}
     
-    def enrich_dataset(self, input_file: Path, output_file: Path, max_new_questions: int = 10) -> Dict[str, Any]:
-        """Enrich an entire dataset with additional VQA questions."""
+    def enrich_dataset(self, input_file: Path, output_file: Path, max_new_questions: int = 10,
+                       max_workers: Optional[int] = None, pretty: bool = False) -> Dict[str, Any]:
+        """Enrich an entire dataset with additional VQA questions.
+        
+        Large datasets are enriched in chunks by up to max_workers worker processes
+        (default: CPU count); the output is written in the input order either way.
+        The output is a compact JSON array with one sample per line, or indented with pretty.
+        """
         if not input_file.exists():
             return {'error': f'Input file not found: {input_file}'}
         
         try:
-            with open(input_file, 'r') as f:
-                data = json.load(f)
+            # Parsed with orjson when it is installed; JSON Lines input is read as well
+            data = read_samples(input_file)
         except json.JSONDecodeError as e:
             return {'error': f'Invalid JSON: {e}'}
         
-        enriched_data = []
         stats = {
             'total_samples': len(data),
             'total_original_questions': 0,
@@ -510,27 +659,88 @@ class VQAEnricher:
             'avg_questions_per_sample_after': 0
         }
         
-        for sample in data:
-            original_questions = len(sample.get('vqa_questions', []))
-            stats['total_original_questions'] += original_questions
-            
-            enriched_sample = self.enrich_sample(sample, max_new_questions)
-            new_questions = len(enriched_sample.get('vqa_questions', [])) - original_questions
-            stats['total_new_questions'] += new_questions
-            
-            enriched_data.append(enriched_sample)
+        # Draw the random questions of every sample up front, a few array operations for the
+        # whole dataset instead of random module calls per sample
+        clinical_picks = self.draw_picks(len(data), len(self.clinical_questions), 3).tolist()
+        comparison_picks = self.draw_picks(len(data), len(self.comparison_questions), 2).tolist()
+        demographic_picks = self.draw_demographic_picks(len(data)).tolist()
+        
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = min(max_workers, len(data) // MIN_SAMPLES_PER_WORKER)
+        
+        # Save enriched data, each sample written as it is enriched instead of building the whole list first;
+        # write_json_array encodes through orjson when it is installed, and with pretty gives the text
+        # json.dump(indent=2) would
+        if max_workers <= 1:
+            with atomic_open(output_file, 'w') as f:
+                write_json_array(self.enriched_samples(data, clinical_picks, comparison_picks,
+                                                       demographic_picks, max_new_questions, stats), f, indent=pretty)
+        else:
+            # A few chunks per worker keeps them all busy to the end; each worker receives this
+            # enricher once and returns the JSON text of its chunks, so the encoding runs in parallel too
+            chunk_size = -(-len(data) // (max_workers * 4))
+            chunks = [
+                (data[start:start + chunk_size], clinical_picks[start:start + chunk_size],
+                 comparison_picks[start:start + chunk_size], demographic_picks[start:start + chunk_size],
+                 max_new_questions, pretty)
+                for start in range(0, len(data), chunk_size)
+            ]
+            opening, closing = ARRAY_BRACKETS[pretty]
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(self,)) as executor, \
+                    atomic_open(output_file, 'w') as f:
+                f.write(opening)
+                for i, (text, chunk_stats) in enumerate(executor.map(_enrich_chunk_worker, chunks)):
+                    # Splice the elements of each chunk's array, between its brackets
+                    elements = text[len(opening):-len(closing)]
+                    f.write(',\n' + elements if i else elements)
+                    stats['total_original_questions'] += chunk_stats['total_original_questions']
+                    stats['total_new_questions'] += chunk_stats['total_new_questions']
+                f.write(closing)
         
         # Calculate averages
         if stats['total_samples'] > 0:
             stats['avg_questions_per_sample_before'] = stats['total_original_questions'] / stats['total_samples']
             stats['avg_questions_per_sample_after'] = (stats['total_original_questions'] + stats['total_new_questions']) / stats['total_samples']
         
-        # Save enriched data
-        with open(output_file, 'w') as f:
-            json.dump(enriched_data, f, indent=2)
-        
         return stats
+    
+    def enriched_samples(self, samples: List[Dict[str, Any]], clinical_picks: List[List[int]],
+                         comparison_picks: List[List[int]], demographic_picks: List[List[int]],
+                         max_new_questions: int, stats: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Yield each sample enriched in place with its picked questions, adding the question counts to stats."""
+        for sample, clinical, comparison, demographic in zip(samples, clinical_picks, comparison_picks,
+                                                             demographic_picks):
+            original_questions = len(sample.get('vqa_questions', []))
+            stats['total_original_questions'] += original_questions
+            
+            # The samples were loaded for this run alone, so they are enriched without copying
+            enriched_sample = self.enrich_sample(sample, max_new_questions, clinical, comparison,
+                                                 in_place=True, demographic_picks=demographic)
+            new_questions = len(enriched_sample.get('vqa_questions', [])) - original_questions
+            stats['total_new_questions'] += new_questions
+            
+            yield enriched_sample
+
+
+# Enricher used by _enrich_chunk_worker, set in each worker process by _init_worker
+_worker_enricher = None
+
+
+def _init_worker(enricher: VQAEnricher) -> None:
+    """Keep the enriching VQAEnricher in a worker process started by enrich_dataset."""
+    global _worker_enricher
+    _worker_enricher = enricher
+
 
+def _enrich_chunk_worker(chunk: Tuple[List[Dict[str, Any]], List[List[int]], List[List[int]], List[List[int]], int, bool]) -> Tuple[str, Dict[str, int]]:
+    """Enrich one chunk of samples in a worker process; return its JSON array text and question counts."""
+    samples, clinical_picks, comparison_picks, demographic_picks, max_new_questions, pretty = chunk
+    stats = {'total_original_questions': 0, 'total_new_questions': 0}
+    text = io.StringIO()
+    write_json_array(_worker_enricher.enriched_samples(samples, clinical_picks, comparison_picks,
+                                                       demographic_picks, max_new_questions, stats), text, indent=pretty)
+    return text.getvalue(), stats
 
 def main():
     """Main function for command-line usage."""
@@ -541,11 +751,18 @@ def main():
     parser.add_argument('--output', type=str, required=True, help='Output JSON file')
     parser.add_argument('--max_questions', type=int, default=10, 
                        help='Maximum number of new questions per sample')
+    parser.add_argument('--seed', type=int, default=None,
+                       help='Random seed for the randomly chosen questions')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Number of worker processes for large datasets (default: CPU count)')
+    parser.add_argument('--pretty', action='store_true',
+                       help='Write indented JSON instead of one compact sample per line')
     
     args = parser.parse_args()
     
-    enricher = VQAEnricher()
-    stats = enricher.enrich_dataset(Path(args.input), Path(args.output), args.max_questions)
+    enricher = VQAEnricher(args.seed)
+    stats = enricher.enrich_dataset(Path(args.input), Path(args.output), args.max_questions, args.workers,
+                                     pretty=args.pretty)
     
     if 'error' in stats:
         print(f"❌ Error: {stats['error']}")